@@ -1,19 +1,57 @@
 import os
+import csv
+import gzip
+import logging
+import hashlib
+import hmac
 import json
+import secrets
+import stat
+import tempfile
 import re
 import io
+import threading
+import time
+import unicodedata
+from difflib import SequenceMatcher
+from collections import OrderedDict
 from pathlib import Path
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-from datetime import datetime
+from flask import Flask, render_template, request, redirect, url_for, session, flash, g, has_request_context, send_file, send_from_directory
+from flask.signals import before_render_template, template_rendered
+from markupsafe import Markup
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from functools import wraps
 from dotenv import load_dotenv
+from flask_mail import Mail, Message
 
 # --- Database and App Setup ---
-from models import db, Student, Vote, VoterRecord, EligibleVoter
-from sqlalchemy import func
+from models import (
+    db,
+    Student,
+    Vote,
+    VoterRecord,
+    EligibleVoter,
+    RankedBallot,
+    WriteIn,
+    VerificationCode,
+    ResultSnapshot,
+    ElectionArchive,
+    BallotSubmission,
+    RosterReport,
+    BallotConfig,
+    CacheVersion,
+)
+from tabulation import RANKED_METHODS, VOTING_METHODS, tabulate
+from metrics import MetricsRegistry, timed
+from mailer import BackgroundMailer
+from sqlalchemy import String, delete, event, func, insert, inspect, literal, select, text, union_all, update
+from sqlalchemy.exc import IntegrityError
 from pypdf import PdfReader
 import zipfile
 import xml.etree.ElementTree as ET
+import click
+import backup
 
 load_dotenv("csu-voting.env", override=True)
 
@@ -30,7 +68,7 @@ def running_on_render():
     return any((os.getenv(marker) or "").strip() for marker in render_markers)
 
 
-def get_persistent_path(env_var_name, default_relative_path, render_default_filename):
+def get_persistent_path(env_var_name, default_relative_path, render_default_filename, shared_state=False):
     configured_path = os.getenv(env_var_name, "").strip()
     if configured_path:
         target_path = Path(configured_path).expanduser()
@@ -38,6 +76,12 @@ def get_persistent_path(env_var_name, default_relative_path, render_default_file
         render_data_path = Path("/var/data")
         if render_data_path.exists():
             target_path = render_data_path / render_default_filename
+        elif shared_state and MULTI_NODE_ENABLED:
+            # Each instance would get its own empty copy under /tmp.
+            raise RuntimeError(
+                f"MULTI_NODE is enabled but no disk is mounted at /var/data. "
+                f"Set {env_var_name} to storage shared by every instance instead of falling back to /tmp."
+            )
         else:
             target_path = Path("/tmp") / render_default_filename
     else:
@@ -46,14 +90,39 @@ def get_persistent_path(env_var_name, default_relative_path, render_default_file
     return target_path
 
 
+def env_flag(name, default=False):
+    value = os.getenv(name, "").strip().lower()
+    if not value:
+        return default
+    return value in {"1", "true", "yes", "on"}
+
+
 # --- Configuration ---
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "devkey")
 database_url = os.getenv("DATABASE_URL", "").strip()
+# Several app instances share one database. Ballot config and cache versions
+# then live in the database instead of local files and process memory.
+MULTI_NODE_ENABLED = env_flag("MULTI_NODE")
+# In multi-node mode this file is only read once, to seed the database copy
+# on first start, so it resolves the same way as in single-node mode: an
+# existing deployment switching over keeps the ballots it already has.
 ballots_path = get_persistent_path(
     env_var_name="CANDIDATES_PATH",
     default_relative_path="candidates.json",
     render_default_filename="candidates.json",
 )
+archive_dir = get_persistent_path(
+    env_var_name="ARCHIVE_DIR",
+    default_relative_path="data/archive",
+    render_default_filename="archive",
+    shared_state=True,
+)
+archive_dir.mkdir(exist_ok=True)
+backup_dir = get_persistent_path(
+    env_var_name="BACKUP_DIR",
+    default_relative_path="data/backups",
+    render_default_filename="backups",
+)
 if database_url:
     app.config["SQLALCHEMY_DATABASE_URI"] = database_url
 else:
@@ -61,18 +130,82 @@ else:
         env_var_name="DB_PATH",
         default_relative_path="data/votes.db",
         render_default_filename="votes.db",
+        shared_state=True,
     )
     app.config["SQLALCHEMY_DATABASE_URI"] = (
         f"sqlite:///{default_db_path.resolve()}"
     )
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-# Initialize database with the app
+# gunicorn.conf.py sets this to the thread count so every worker thread can
+# hold a connection without waiting on the pool.
+db_pool_size = int(os.getenv("DB_POOL_SIZE", "").strip() or 0)
+if db_pool_size:
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"pool_size": db_pool_size, "max_overflow": db_pool_size}
+# Threaded workers share one SQLite file. WAL lets pages and results be read
+# while a ballot is being written, and busy_timeout makes writers queue for
+# the lock instead of failing. Set SQLITE_JOURNAL_MODE=DELETE when the file
+# lives on a network filesystem, where WAL is not safe.
+SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "WAL"}
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "").strip().upper() or "WAL"
+if SQLITE_JOURNAL_MODE not in SQLITE_JOURNAL_MODES:
+    raise RuntimeError(f"SQLITE_JOURNAL_MODE must be one of {', '.join(sorted(SQLITE_JOURNAL_MODES))}.")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "").strip() or 15000)
+smtp_port = int(os.getenv("SMTP_PORT", "").strip() or 587)
+app.config["MAIL_SERVER"] = os.getenv("SMTP_SERVER", "").strip() or "127.0.0.1"
+app.config["MAIL_PORT"] = smtp_port
+app.config["MAIL_USE_SSL"] = smtp_port == 465
+app.config["MAIL_USE_TLS"] = env_flag("MAIL_USE_TLS", default=smtp_port == 587)
+app.config["MAIL_USERNAME"] = os.getenv("EMAIL_USER") or None
+app.config["MAIL_PASSWORD"] = os.getenv("EMAIL_PASS") or None
+app.config["MAIL_DEFAULT_SENDER"] = os.getenv("MAIL_DEFAULT_SENDER") or os.getenv("EMAIL_USER")
+app.config["MAIL_SUPPRESS_SEND"] = env_flag("MAIL_SUPPRESS_SEND")
+
+# Initialize database and mail with the app
 db.init_app(app)
+mail = Mail(app)
+mailer = BackgroundMailer(app, mail)
 
 # --- Create database tables ---
+# Columns added after the first release. db.create_all() never alters an
+# existing table, so older databases get them through ALTER TABLE on startup.
+SCHEMA_COLUMN_ADDITIONS = (
+    (VoterRecord, "voted_at"),
+    (Vote, "year"),
+    (Vote, "question_index"),
+)
+# Indexes added later to tables that did not gain any columns.
+SCHEMA_INDEX_ADDITIONS = (EligibleVoter,)
+
+
+def ensure_schema_columns():
+    inspector = inspect(db.engine)
+    for model, column_name in SCHEMA_COLUMN_ADDITIONS:
+        table_name = model.__tablename__
+        existing_columns = {column["name"] for column in inspector.get_columns(table_name)}
+        if column_name in existing_columns:
+            continue
+        column_type = model.__table__.c[column_name].type.compile(dialect=db.engine.dialect)
+        db.session.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+    db.session.commit()
+    for model in {model for model, _ in SCHEMA_COLUMN_ADDITIONS} | set(SCHEMA_INDEX_ADDITIONS):
+        for index in model.__table__.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    finally:
+        cursor.close()
+
+
 with app.app_context():
+    if db.engine.dialect.name == "sqlite":
+        event.listen(db.engine, "connect", configure_sqlite_connection)
     db.create_all()
+    ensure_schema_columns()
 
 # --- Environment Variables & Constants ---
 VOTING_PASSWORD = os.getenv("VOTING_PASSWORD")
@@ -80,10 +213,57 @@ ADMIN_USER = os.getenv("ADMIN_USER", "admin")
 ADMIN_PASS = os.getenv("ADMIN_PASS", "password")
 STUDENT_EMAIL_PATTERN = re.compile(r"^[a-z]{2}[a-z]+@student\.csuniv\.edu$")
 STUDENT_EMAIL_DOMAIN = "@student.csuniv.edu"
+STUDENT_EMAIL_LOCAL_STRIP = re.compile(r"[^a-z]")
+ROSTER_ROW_STATUSES = (
+    ("valid", "Loaded"),
+    ("duplicate", "Repeats an earlier row"),
+    ("conflicting_duplicate", "Email already listed with a different name"),
+    ("invalid_email", "Not a CSU student email"),
+    ("missing_email", "Missing email"),
+    ("missing_name", "Missing name"),
+)
+ROSTER_REPORT_FORMULA_PREFIXES = ("=", "+", "-", "@")
+TURNOUT_CACHE_SECONDS = float(os.getenv("TURNOUT_CACHE_SECONDS", "5"))
+WRITE_IN_MAX_LENGTH = 120
+WRITE_IN_DISTINCT_LIMIT = int(os.getenv("WRITE_IN_DISTINCT_LIMIT", "250"))
+WRITE_IN_OVERFLOW_KEY = "~overflow"
+WRITE_IN_SIMILARITY_THRESHOLD = 0.9
+WRITE_IN_STRIP_PATTERN = re.compile(r"[^\w\s]")
+FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", "256"))
+FRAGMENT_CACHE_MAX_BYTES = int(os.getenv("FRAGMENT_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+VOTING_METHOD_CHOICES = (
+    ("plurality", "Plurality (most votes wins)"),
+    ("approval", "Approval (select any number)"),
+    ("irv", "Instant-runoff (ranked)"),
+    ("stv", "Single transferable vote (ranked, multi-seat)"),
+)
+METRICS_ENABLED = env_flag("METRICS_ENABLED")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0") or 0)
+CACHE_VERSION_POLL_SECONDS = float(os.getenv("CACHE_VERSION_POLL_SECONDS", "1"))
+EMAIL_VERIFICATION_ENABLED = env_flag("EMAIL_VERIFICATION", default=bool(os.getenv("SMTP_SERVER", "").strip()))
+VERIFICATION_CODE_MINUTES = int(os.getenv("VERIFICATION_CODE_MINUTES", "10"))
+VERIFICATION_CODE_MAX_ATTEMPTS = 5
+VERIFICATION_CODE_RESEND_SECONDS = 60
+election_timezone_name = os.getenv("ELECTION_TIMEZONE", "").strip() or "America/New_York"
+try:
+    ELECTION_TIMEZONE = ZoneInfo(election_timezone_name)
+except (ZoneInfoNotFoundError, ValueError) as exc:
+    # Guessing a zone would shift every opening, closing and results freeze.
+    raise RuntimeError(
+        f"ELECTION_TIMEZONE {election_timezone_name!r} is not a known time zone. "
+        "Use an IANA name such as America/New_York and make sure tzdata is installed."
+    ) from exc
+# Votes already past the open/closed check when the ballot closes get this
+# long to commit before the final tallies are frozen.
+RESULT_SNAPSHOT_GRACE_SECONDS = int(os.getenv("RESULT_SNAPSHOT_GRACE_SECONDS", "60"))
+metrics_registry = MetricsRegistry()
 
 # --- Helper Functions ---
+@timed(metrics_registry, "csu_function_duration_seconds", METRICS_ENABLED)
 def load_candidates():
-    if not ballots_path.exists():
+    data = read_ballot_config()
+    if data is None:
         default_ballots = {
             "General Election": {
                 "description": "Select up to 10 options.",
@@ -98,8 +278,6 @@ def load_candidates():
         }
         save_candidates(default_ballots)
         return default_ballots
-    with ballots_path.open() as f:
-        data = json.load(f)
     normalized_data = {}
     if isinstance(data, dict):
         for ballot_name, ballot_data in data.items():
@@ -141,6 +319,7 @@ def load_candidates():
                     show_if = parse_show_if_rule(question)
                     if show_if:
                         normalized_question["show_if"] = show_if
+                    normalized_question.update(parse_voting_method_rule(question))
                     normalized_questions.append(normalized_question)
                 if not normalized_questions:
                     normalized_questions = [
@@ -154,6 +333,10 @@ def load_candidates():
                     "description": (ballot_data.get("description") or "").strip(),
                     "questions": normalized_questions,
                 }
+                for schedule_key in ("opens_at", "closes_at"):
+                    schedule_value = parse_schedule_time(ballot_data.get(schedule_key))
+                    if schedule_value:
+                        normalized_data[ballot_name][schedule_key] = schedule_value
     if not normalized_data:
         normalized_data = {
             "General Election": {
@@ -175,8 +358,7 @@ def normalize_student_email(value):
     email_value = (value or "").strip().lower()
     if not email_value:
         return ""
-    local_part = email_value.split("@", 1)[0]
-    local_part = re.sub(r"[^a-z]", "", local_part)
+    local_part = STUDENT_EMAIL_LOCAL_STRIP.sub("", email_value.split("@", 1)[0])
     if not local_part:
         return ""
     return f"{local_part}{STUDENT_EMAIL_DOMAIN}"
@@ -184,6 +366,12 @@ def normalize_student_email(value):
 def normalize_name(value):
     return " ".join((value or "").strip().lower().split())
 
+def canonicalize_write_in(value):
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+    folded = WRITE_IN_STRIP_PATTERN.sub("", folded)
+    return " ".join(folded.split())
+
 def parse_options(text):
     return [line.strip() for line in (text or "").splitlines() if line.strip()]
 
@@ -246,13 +434,22 @@ def parse_eligible_voters_excel(file_storage):
         sheet_path = f"xl/{target}" if not target.startswith("xl/") else target
         sheet_root = ET.fromstring(archive.read(sheet_path))
 
-    namespace = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+    # The sheet is walked with plain tag comparisons instead of per-cell
+    # find() path lookups; on large rosters those lookups dominated parsing.
+    main_ns = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+    cell_tag, value_tag, inline_tag, text_tag = (f"{main_ns}c", f"{main_ns}v", f"{main_ns}is", f"{main_ns}t")
 
     def cell_value(cell):
         cell_type = cell.attrib.get("t")
-        value_node = cell.find("x:v", namespace)
+        value_node = None
+        inline_node = None
+        for child in cell:
+            if child.tag == value_tag:
+                value_node = child
+                break
+            if child.tag == inline_tag and inline_node is None:
+                inline_node = next(child.iter(text_tag), None)
         if value_node is None:
-            inline_node = cell.find("x:is/x:t", namespace)
             return (inline_node.text or "").strip() if inline_node is not None else ""
         raw_value = value_node.text or ""
         if cell_type == "s":
@@ -273,14 +470,24 @@ def parse_eligible_voters_excel(file_storage):
             index = index * 26 + (ord(letter.upper()) - ord("A") + 1)
         return max(index - 1, 0)
 
+    column_indexes = {}
     parsed_rows = []
     rows_data = []
-    for row in sheet_root.findall(".//x:sheetData/x:row", namespace):
+    row_numbers = []
+    for row in sheet_root.iter(f"{main_ns}row"):
+        row_number = row.attrib.get("r", "")
+        row_numbers.append(int(row_number) if row_number.isdigit() else len(row_numbers) + 1)
         row_values = {}
-        for cell in row.findall("x:c", namespace):
-            cell_ref = cell.attrib.get("r", "")
-            match = re.match(r"([A-Za-z]+)", cell_ref)
-            col_index = column_letters_to_index(match.group(1)) if match else len(row_values)
+        for cell in row:
+            if cell.tag != cell_tag:
+                continue
+            column_letters = cell.attrib.get("r", "").rstrip("0123456789")
+            if column_letters:
+                col_index = column_indexes.get(column_letters)
+                if col_index is None:
+                    col_index = column_indexes[column_letters] = column_letters_to_index(column_letters)
+            else:
+                col_index = len(row_values)
             row_values[col_index] = cell_value(cell)
         rows_data.append(row_values)
 
@@ -318,11 +525,10 @@ def parse_eligible_voters_excel(file_storage):
             last_name_index, first_name_index = ordered_indexes[0], ordered_indexes[1]
             start_row = 0
 
-    for row in rows_data[start_row:]:
-        email = normalize_student_email(str(row.get(email_index, "")))
-        if not STUDENT_EMAIL_PATTERN.match(email):
-            continue
-
+    # Every data row is returned, valid or not; validate_roster_rows decides
+    # which ones are loaded and reports the rest.
+    for row_number, row in zip(row_numbers[start_row:], rows_data[start_row:]):
+        email = str(row.get(email_index, "")).strip()
         if name_index is not None:
             full_name = str(row.get(name_index, "")).strip()
         else:
@@ -330,13 +536,68 @@ def parse_eligible_voters_excel(file_storage):
             last_name = str(row.get(last_name_index, "")).strip() if last_name_index is not None else ""
             full_name = " ".join(part for part in [first_name, last_name] if part).strip()
 
-        if not full_name:
+        if not full_name and not email:
             continue
-        parsed_rows.append({"full_name": full_name, "email": email})
+        parsed_rows.append({"row_number": row_number, "full_name": full_name, "email": email})
 
     return parsed_rows
 
 
+def validate_roster_rows(rows):
+    """Classify every parsed roster row in a single pass.
+
+    Returns (voters, report_rows, counts). voters holds the rows to load;
+    report_rows holds every row with its status for the downloadable report.
+    The first row for an email is loaded. Later rows for the same email are
+    duplicates, or conflicting duplicates when the name differs.
+    """
+    match_email = STUDENT_EMAIL_PATTERN.match
+    names_by_email = {}
+    voters = []
+    report_rows = []
+    counts = {status: 0 for status, _ in ROSTER_ROW_STATUSES}
+    for row in rows:
+        full_name = " ".join(row["full_name"].split())
+        raw_email = row["email"]
+        email = normalize_student_email(raw_email)
+        if not raw_email:
+            status = "missing_email"
+        elif not match_email(email):
+            status = "invalid_email"
+        elif not full_name:
+            status = "missing_name"
+        else:
+            name_key = full_name.lower()
+            listed_name = names_by_email.get(email)
+            if listed_name is None:
+                names_by_email[email] = name_key
+                status = "valid"
+                voters.append({"full_name": full_name, "email": email})
+            elif listed_name == name_key:
+                status = "duplicate"
+            else:
+                status = "conflicting_duplicate"
+        counts[status] += 1
+        report_rows.append((row["row_number"], full_name, raw_email, email if status != "invalid_email" else "", status))
+    return voters, report_rows, counts
+
+
+def roster_report_csv(report_rows):
+    labels = dict(ROSTER_ROW_STATUSES)
+
+    def safe_cell(value):
+        # Keep spreadsheet apps from evaluating uploaded text as a formula.
+        value = str(value)
+        return f"'{value}" if value.startswith(ROSTER_REPORT_FORMULA_PREFIXES) else value
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["row", "full_name", "email", "normalized_email", "status", "detail"])
+    for row_number, full_name, raw_email, email, status in report_rows:
+        writer.writerow([row_number, safe_cell(full_name), safe_cell(raw_email), email, status, labels[status]])
+    return output.getvalue()
+
+
 
 def parse_show_if_rule(question):
     if not isinstance(question, dict):
@@ -355,6 +616,46 @@ def parse_show_if_rule(question):
     return {"question_number": question_number, "option": option}
 
 
+def parse_voting_method_rule(question):
+    # Plurality is the default and is left out of the stored configuration.
+    if not isinstance(question, dict):
+        return {}
+    voting_method = str(question.get("voting_method") or "plurality").strip().lower()
+    if voting_method not in VOTING_METHODS or voting_method == "plurality":
+        return {}
+    rule = {"voting_method": voting_method}
+    if voting_method in ("approval", "stv"):
+        rule["seats"] = validate_max_selections(question.get("seats"), default=1)
+    return rule
+
+
+def parse_schedule_time(value):
+    # Schedules are stored as minute-precision local times in ELECTION_TIMEZONE,
+    # which is also what the admin's datetime-local inputs submit.
+    text_value = str(value or "").strip()
+    if not text_value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(text_value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(ELECTION_TIMEZONE).replace(tzinfo=None)
+    return parsed.replace(second=0, microsecond=0).isoformat(timespec="minutes")
+
+
+def schedule_time_utc(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value).replace(tzinfo=ELECTION_TIMEZONE).astimezone(timezone.utc)
+
+
+def format_schedule_time(value):
+    if not value:
+        return ""
+    return datetime.fromisoformat(value).strftime("%b %d, %Y at %I:%M %p").replace(" 0", " ")
+
+
 def question_is_visible(question, answers_by_index):
     show_if = question.get("show_if")
     if not isinstance(show_if, dict):
@@ -365,6 +666,209 @@ def question_is_visible(question, answers_by_index):
         return True
     return option in answers_by_index.get(parent_index, [])
 
+def collect_ballot_responses(questions, form):
+    responses = []
+    answers_by_index = {}
+    for index, question in enumerate(questions):
+        if not question_is_visible(question, answers_by_index):
+            continue
+        prompt = question.get("prompt", f"Question {index + 1}")
+        voting_method = question.get("voting_method", "plurality")
+        if voting_method in RANKED_METHODS:
+            ranked_choices = []
+            for option_index, option in enumerate(question.get("options", [])):
+                rank = form.get(f"question_{index}_rank_{option_index}", "").strip()
+                if not rank:
+                    continue
+                try:
+                    ranked_choices.append((int(rank), option))
+                except ValueError:
+                    return None, f"'{prompt}' has an invalid ranking."
+            ranks = [rank for rank, _ in ranked_choices]
+            if len(set(ranks)) != len(ranks):
+                return None, f"'{prompt}' uses the same rank more than once."
+            question_choices = [option for _, option in sorted(ranked_choices)]
+            write_in = ""
+        elif voting_method == "approval":
+            approved = set(form.getlist(f"question_{index}_candidates"))
+            question_choices = [option for option in question.get("options", []) if option in approved]
+            write_in = ""
+        else:
+            question_choices = form.getlist(f"question_{index}_candidates")
+            write_in = " ".join(form.get(f"question_{index}_write_in", "").split())
+            if len(write_in) > WRITE_IN_MAX_LENGTH:
+                return None, f"Write-ins for '{prompt}' must be {WRITE_IN_MAX_LENGTH} characters or fewer."
+            if write_in and not canonicalize_write_in(write_in):
+                write_in = ""
+            question_max = question.get("max_selections", 1)
+            if len(question_choices) + (1 if write_in else 0) > question_max:
+                return None, f"'{prompt}' allows up to {question_max} selections."
+        answers_by_index[index] = question_choices + ([write_in] if write_in else [])
+        if answers_by_index[index]:
+            responses.append(
+                {
+                    "question_index": index,
+                    "voting_method": voting_method,
+                    "choices": question_choices,
+                    "write_in": write_in,
+                }
+            )
+    return responses, None
+
+
+def resolve_write_in_key(year, question_index, canonical_key):
+    # Each ballot question accepts a bounded number of distinct write-ins so a
+    # flood of unique strings cannot grow the results grouping without limit.
+    # Anything past the cap is still recorded, under a shared overflow key.
+    scope = db.session.query(WriteIn.id).filter(WriteIn.year == year, WriteIn.question_index == question_index)
+    if scope.filter(WriteIn.canonical_key == canonical_key).first() is not None:
+        return canonical_key
+    distinct_keys = (
+        db.session.query(func.count(func.distinct(WriteIn.canonical_key)))
+        .filter(WriteIn.year == year, WriteIn.question_index == question_index)
+        .scalar()
+    )
+    if distinct_keys >= WRITE_IN_DISTINCT_LIMIT:
+        return WRITE_IN_OVERFLOW_KEY
+    return canonical_key
+
+
+def record_ballot_responses(year, responses):
+    cast_at = datetime.utcnow()
+    for response in responses:
+        if response["voting_method"] == "plurality":
+            for candidate_name in response["choices"]:
+                db.session.add(
+                    Vote(candidate=candidate_name, year=year, question_index=response["question_index"])
+                )
+            if response["write_in"]:
+                db.session.add(
+                    WriteIn(
+                        year=year,
+                        question_index=response["question_index"],
+                        raw_text=response["write_in"],
+                        canonical_key=resolve_write_in_key(
+                            year,
+                            response["question_index"],
+                            canonicalize_write_in(response["write_in"]),
+                        ),
+                        cast_at=cast_at,
+                    )
+                )
+        else:
+            db.session.add(
+                RankedBallot(
+                    year=year,
+                    question_index=response["question_index"],
+                    preferences=json.dumps(response["choices"]),
+                    cast_at=cast_at,
+                )
+            )
+
+
+def group_write_ins(rows):
+    # rows are (canonical_key, total, display_text). Keys that only differ in
+    # word order or by a small edit distance are folded into one group, led by
+    # the most common spelling.
+    groups = []
+    for canonical_key, total, display_text in sorted(rows, key=lambda row: row[1], reverse=True):
+        if canonical_key == WRITE_IN_OVERFLOW_KEY:
+            continue
+        token_key = " ".join(sorted(canonical_key.split()))
+        matcher = SequenceMatcher(None, b=canonical_key)
+        target = None
+        for group in groups:
+            if token_key == group["token_key"]:
+                target = group
+                break
+            matcher.set_seq1(group["key"])
+            if matcher.real_quick_ratio() >= WRITE_IN_SIMILARITY_THRESHOLD and matcher.ratio() >= WRITE_IN_SIMILARITY_THRESHOLD:
+                target = group
+                break
+        if target is None:
+            groups.append(
+                {
+                    "key": canonical_key,
+                    "token_key": token_key,
+                    "label": display_text,
+                    "total": total,
+                    "variants": [(display_text, total)],
+                }
+            )
+        else:
+            target["total"] += total
+            target["variants"].append((display_text, total))
+    groups.sort(key=lambda group: group["total"], reverse=True)
+    overflow_total = sum(total for canonical_key, total, _ in rows if canonical_key == WRITE_IN_OVERFLOW_KEY)
+    if overflow_total:
+        groups.append(
+            {
+                "key": WRITE_IN_OVERFLOW_KEY,
+                "token_key": WRITE_IN_OVERFLOW_KEY,
+                "label": "Other write-ins (distinct write-in limit reached)",
+                "total": overflow_total,
+                "variants": [],
+            }
+        )
+    return groups
+
+
+def compute_ballot_results(ballot_name, ballot):
+    plurality_rows = (
+        db.session.query(Vote.question_index, Vote.candidate, func.count(Vote.id))
+        .filter(Vote.year == ballot_name)
+        .group_by(Vote.question_index, Vote.candidate)
+        .all()
+    )
+    # Identical rankings are grouped in SQL so the tabulator receives one
+    # row per distinct preference list rather than one per voter.
+    ranked_rows = (
+        db.session.query(RankedBallot.question_index, RankedBallot.preferences, func.count(RankedBallot.id))
+        .filter(RankedBallot.year == ballot_name)
+        .group_by(RankedBallot.question_index, RankedBallot.preferences)
+        .all()
+    )
+    write_in_rows = (
+        db.session.query(WriteIn.question_index, WriteIn.canonical_key, func.count(WriteIn.id), func.min(WriteIn.raw_text))
+        .filter(WriteIn.year == ballot_name)
+        .group_by(WriteIn.question_index, WriteIn.canonical_key)
+        .all()
+    )
+    write_ins_by_question = {}
+    for question_index, canonical_key, total, display_text in write_in_rows:
+        write_ins_by_question.setdefault(question_index, []).append((canonical_key, total, display_text))
+    plurality_by_question = {}
+    for question_index, candidate, total in plurality_rows:
+        plurality_by_question.setdefault(question_index, []).append((candidate, total))
+    ranked_by_question = {}
+    for question_index, preferences, total in ranked_rows:
+        ranked_by_question.setdefault(question_index, []).append((json.loads(preferences), total))
+
+    question_results = []
+    for index, question in enumerate(ballot.get("questions", [])):
+        voting_method = question.get("voting_method", "plurality")
+        question_result = {
+            "prompt": question.get("prompt", f"Question {index + 1}"),
+            "voting_method": voting_method,
+        }
+        if voting_method == "plurality":
+            question_result["tallies"] = sorted(
+                plurality_by_question.get(index, []),
+                key=lambda row: row[1],
+                reverse=True,
+            )
+            question_result["write_ins"] = group_write_ins(write_ins_by_question.get(index, []))
+        else:
+            question_result["tabulation"] = tabulate(
+                voting_method,
+                question.get("options", []),
+                ranked_by_question.get(index, []),
+                seats=question.get("seats", 1),
+            )
+        question_results.append(question_result)
+    return question_results
+
+
 def parse_questions_json(text):
     try:
         parsed = json.loads(text or "[]")
@@ -391,12 +895,58 @@ def parse_questions_json(text):
         show_if = parse_show_if_rule(question)
         if show_if:
             normalized_question["show_if"] = show_if
+        normalized_question.update(parse_voting_method_rule(question))
         normalized_questions.append(normalized_question)
     return normalized_questions
 
+def read_ballot_config():
+    """Return the stored ballot config, or None if none has been saved yet."""
+    if not MULTI_NODE_ENABLED:
+        if not ballots_path.exists():
+            return None
+        with ballots_path.open() as f:
+            return json.load(f)
+    version = ballot_config_version()
+    cached_version, config_text = _ballot_config_text["state"]
+    if cached_version != version:
+        config_text = db.session.execute(select(BallotConfig.data).where(BallotConfig.id == 1)).scalar()
+        _ballot_config_text["state"] = (version, config_text)
+    return json.loads(config_text) if config_text is not None else None
+
 def save_candidates(data):
-    with ballots_path.open("w") as f:
-        json.dump(data, f, indent=2)
+    if MULTI_NODE_ENABLED:
+        config_row = db.session.get(BallotConfig, 1)
+        if config_row is None:
+            config_row = BallotConfig(id=1)
+            db.session.add(config_row)
+        config_row.data = json.dumps(data, indent=2)
+        config_row.updated_at = datetime.utcnow()
+        bump_cache_version(BALLOT_CONFIG_VERSION_KEY)
+        db.session.commit()
+        cache_versions(refresh=True)
+        fragment_cache.clear()
+        return
+    # Written beside the real file and renamed over it so readers, including
+    # backups, never see a half-written ballot file.
+    # Each writer gets its own temporary file, since threads and workers can
+    # save at the same time (load_candidates saves the default ballot).
+    descriptor, temporary_name = tempfile.mkstemp(
+        prefix=f".{ballots_path.name}.", suffix=".tmp", dir=ballots_path.parent
+    )
+    try:
+        with os.fdopen(descriptor, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(temporary_name, stat.S_IMODE(ballots_path.stat().st_mode))
+        except FileNotFoundError:
+            os.chmod(temporary_name, 0o644)
+        os.replace(temporary_name, ballots_path)
+    except BaseException:
+        Path(temporary_name).unlink(missing_ok=True)
+        raise
+    fragment_cache.clear()
 
 def validate_max_selections(value, default=10):
     try:
@@ -407,6 +957,613 @@ def validate_max_selections(value, default=10):
     except (TypeError, ValueError):
         return default
 
+# --- Shared Cache Versions ---
+BALLOT_CONFIG_VERSION_KEY = "ballot_config"
+ROSTER_VERSION_KEY = "roster"
+_cache_versions = {"state": (float("-inf"), {})}
+_ballot_config_text = {"state": (None, None)}
+_roster_presence = {"state": (None, {})}
+
+
+def ensure_cache_versions():
+    existing = set(db.session.execute(select(CacheVersion.name)).scalars())
+    for name in (BALLOT_CONFIG_VERSION_KEY, ROSTER_VERSION_KEY):
+        if name not in existing:
+            db.session.add(CacheVersion(name=name, version=0))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker created them first.
+        db.session.rollback()
+
+
+def cache_versions(refresh=False):
+    """Shared cache versions, re-read from the database at most every CACHE_VERSION_POLL_SECONDS."""
+    checked_at, versions = _cache_versions["state"]
+    now = time.monotonic()
+    if refresh or now - checked_at >= CACHE_VERSION_POLL_SECONDS:
+        versions = dict(db.session.execute(select(CacheVersion.name, CacheVersion.version)).all())
+        _cache_versions["state"] = (now, versions)
+    return versions
+
+
+def bump_cache_version(name):
+    """Increment a shared version; commits with the caller's transaction."""
+    db.session.execute(
+        update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+    )
+
+
+def ballot_has_roster(ballot_name):
+    version = cache_versions().get(ROSTER_VERSION_KEY, 0)
+    cached_version, presence = _roster_presence["state"]
+    if cached_version != version:
+        presence = {}
+        _roster_presence["state"] = (version, presence)
+    if ballot_name not in presence:
+        presence[ballot_name] = (
+            db.session.query(EligibleVoter.id).filter_by(year=ballot_name).first() is not None
+        )
+    return presence[ballot_name]
+
+
+def seed_ballot_config():
+    # First multi-node start: copy the local ballot file into the database.
+    if db.session.get(BallotConfig, 1) is not None or not ballots_path.exists():
+        return
+    with ballots_path.open() as f:
+        data = json.load(f)
+    try:
+        save_candidates(data)
+    except IntegrityError:
+        db.session.rollback()
+
+# --- Rendered Fragment Cache ---
+class FragmentCache:
+    """Thread-safe LRU of rendered template fragments, bounded by entry count and size."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        value_size = len(value)
+        if self.max_entries <= 0 or value_size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += value_size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+fragment_cache = FragmentCache(FRAGMENT_CACHE_MAX_ENTRIES, FRAGMENT_CACHE_MAX_BYTES)
+
+
+def ballot_config_version():
+    # The ballot config may be rewritten by another worker process or host,
+    # so the cache key follows the stored config rather than an in-process
+    # counter: the shared version row in multi-node mode, the file otherwise.
+    if MULTI_NODE_ENABLED:
+        return ("db", cache_versions().get(BALLOT_CONFIG_VERSION_KEY, 0))
+    try:
+        stat_result = ballots_path.stat()
+    except OSError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def render_cached_fragment(template_name, cache_key, **context):
+    key = (template_name, ballot_config_version()) + cache_key
+    fragment = fragment_cache.get(key)
+    if fragment is None:
+        fragment = render_template(template_name, **context)
+        fragment_cache.set(key, fragment)
+    return Markup(fragment)
+
+with app.app_context():
+    ensure_cache_versions()
+    if MULTI_NODE_ENABLED:
+        seed_ballot_config()
+
+# --- Ballot Schedule ---
+# Open/close instants per ballot, parsed once per version of the ballot file.
+# Deciding whether a ballot is open is then two comparisons, so traffic for a
+# ballot that is not open is turned away before any database query.
+_ballot_schedule = {"state": (None, {})}
+
+
+def ballot_schedule():
+    version, windows = _ballot_schedule["state"]
+    current_version = ballot_config_version()
+    if current_version is None or current_version != version:
+        windows = {
+            ballot_name: (
+                schedule_time_utc(ballot.get("opens_at")),
+                schedule_time_utc(ballot.get("closes_at")),
+            )
+            for ballot_name, ballot in load_candidates().items()
+        }
+        _ballot_schedule["state"] = (ballot_config_version(), windows)
+    return windows
+
+
+def ballot_state(ballot_name, now=None):
+    """Return "scheduled", "open" or "closed" for a configured ballot."""
+    opens_at, closes_at = ballot_schedule().get(ballot_name, (None, None))
+    now = now or datetime.now(timezone.utc)
+    if opens_at and now < opens_at:
+        return "scheduled"
+    if closes_at and now >= closes_at:
+        return "closed"
+    return "open"
+
+
+def ballot_unavailable_message(ballot_name, ballot, state):
+    if state == "scheduled":
+        return f"Voting for '{ballot_name}' opens {format_schedule_time(ballot.get('opens_at'))}."
+    return f"Voting for '{ballot_name}' closed {format_schedule_time(ballot.get('closes_at'))}."
+
+
+def frozen_ballot_results(ballot_name, ballot):
+    """Final results of a closed ballot, tallied once and then read from its snapshot.
+
+    Returns None until the close time plus RESULT_SNAPSHOT_GRACE_SECONDS has
+    passed. A snapshot taken for a different close time (the ballot was
+    reopened) is replaced.
+    """
+    closes_at = ballot.get("closes_at")
+    if not closes_at:
+        return None
+    snapshot = ResultSnapshot.query.filter_by(year=ballot_name).first()
+    if snapshot is not None and snapshot.closes_at == closes_at:
+        return json.loads(snapshot.payload)
+    freeze_at = schedule_time_utc(closes_at) + timedelta(seconds=RESULT_SNAPSHOT_GRACE_SECONDS)
+    if datetime.now(timezone.utc) < freeze_at:
+        return None
+    question_results = compute_ballot_results(ballot_name, ballot)
+    if snapshot is None:
+        snapshot = ResultSnapshot(year=ballot_name)
+        db.session.add(snapshot)
+    snapshot.closes_at = closes_at
+    snapshot.payload = json.dumps(question_results)
+    snapshot.created_at = datetime.utcnow()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker froze this ballot at the same moment.
+        db.session.rollback()
+    return question_results
+
+# --- Election Archives ---
+# Live tables holding per-ballot rows, in the order they are written to an archive.
+ARCHIVED_TABLES = (
+    (Vote, Vote.year),
+    (RankedBallot, RankedBallot.year),
+    (WriteIn, WriteIn.year),
+    (VoterRecord, VoterRecord.year),
+    (EligibleVoter, EligibleVoter.year),
+    (Student, Student.year),
+    (BallotSubmission, BallotSubmission.year),
+)
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def delete_ballot_rows(ballot_name):
+    """Delete every live row scoped to a ballot. The caller commits."""
+    for model, year_column in ARCHIVED_TABLES:
+        db.session.execute(delete(model).where(year_column == ballot_name))
+    db.session.execute(delete(VerificationCode).where(VerificationCode.year == ballot_name))
+    db.session.execute(delete(ResultSnapshot).where(ResultSnapshot.year == ballot_name))
+    db.session.execute(delete(RosterReport).where(RosterReport.year == ballot_name))
+    bump_cache_version(ROSTER_VERSION_KEY)
+
+
+def archive_file_name(ballot_name, archived_at):
+    slug = re.sub(r"[^a-z0-9]+", "-", ballot_name.lower()).strip("-") or "ballot"
+    return f"{slug}-{archived_at:%Y%m%dT%H%M%S}.jsonl.gz"
+
+
+def archive_row(row):
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+
+def archive_election(ballot_name, ballot, question_results):
+    """Move a closed ballot's rows out of the live tables into ARCHIVE_DIR.
+
+    The archive is a gzip JSON lines file: a header with the ballot config and
+    final results, then one {"table", "row"} line per archived row. It is
+    fully written and fsynced before the rows are deleted, and the deletes and
+    the ElectionArchive summary row commit together.
+    """
+    archived_at = datetime.utcnow()
+    file_name = archive_file_name(ballot_name, archived_at)
+    archive_path = archive_dir / file_name
+    temporary_path = archive_path.with_name(f"{file_name}.tmp")
+    row_counts = {}
+    with temporary_path.open("wb") as raw_file:
+        with gzip.open(raw_file, "wt", encoding="utf-8") as archive_file:
+            header = {
+                "ballot": ballot_name,
+                "config": ballot,
+                "results": question_results,
+                "archived_at": archived_at.isoformat(),
+            }
+            archive_file.write(json.dumps(header) + "\n")
+            for model, year_column in ARCHIVED_TABLES:
+                rows = db.session.execute(
+                    select(model.__table__)
+                    .where(year_column == ballot_name)
+                    .execution_options(yield_per=ARCHIVE_BATCH_SIZE)
+                )
+                row_count = 0
+                for row in rows.mappings():
+                    archive_file.write(json.dumps({"table": model.__tablename__, "row": archive_row(row)}) + "\n")
+                    row_count += 1
+                row_counts[model.__tablename__] = row_count
+        raw_file.flush()
+        os.fsync(raw_file.fileno())
+    os.replace(temporary_path, archive_path)
+
+    try:
+        voters = VoterRecord.query.filter_by(year=ballot_name, has_voted=True).count()
+        delete_ballot_rows(ballot_name)
+        archive = ElectionArchive(
+            year=ballot_name,
+            archived_at=archived_at,
+            file_name=file_name,
+            ballot_config=json.dumps(ballot),
+            results=json.dumps(question_results),
+            row_counts=json.dumps(row_counts),
+            voters=voters,
+        )
+        db.session.add(archive)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        archive_path.unlink(missing_ok=True)
+        raise
+    return archive
+
+# --- Turnout Analytics ---
+_turnout_cache = {"expires_at": 0.0, "stats": None, "hits": 0, "misses": 0}
+_turnout_cache_lock = threading.Lock()
+
+
+def turnout_bucket_expression(column):
+    if db.engine.dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:00", column)
+    return func.to_char(func.date_trunc("hour", column), "YYYY-MM-DD HH24:00")
+
+
+def compute_turnout_stats():
+    # One UNION ALL round trip: roster size, verified voters and an hourly
+    # histogram of cast ballots, each grouped per ballot.
+    empty_bucket = literal(None, String).label("bucket")
+    eligible_query = (
+        select(literal("eligible").label("metric"), EligibleVoter.year.label("year"), empty_bucket, func.count(EligibleVoter.id).label("total"))
+        .group_by(EligibleVoter.year)
+    )
+    verified_query = (
+        select(literal("verified").label("metric"), VoterRecord.year.label("year"), empty_bucket, func.count(VoterRecord.id).label("total"))
+        .group_by(VoterRecord.year)
+    )
+    voted_bucket = turnout_bucket_expression(VoterRecord.voted_at).label("bucket")
+    voted_query = (
+        select(literal("voted").label("metric"), VoterRecord.year.label("year"), voted_bucket, func.count(VoterRecord.id).label("total"))
+        .where(VoterRecord.has_voted.is_(True))
+        .group_by(VoterRecord.year, voted_bucket)
+    )
+    rows = db.session.execute(union_all(eligible_query, verified_query, voted_query)).all()
+
+    stats = {
+        name: {"eligible": 0, "verified": 0, "voted": 0, "histogram": {}}
+        for name in load_candidates().keys()
+    }
+    for metric, year, bucket, total in rows:
+        ballot_stats = stats.setdefault(year, {"eligible": 0, "verified": 0, "voted": 0, "histogram": {}})
+        if metric == "voted":
+            ballot_stats["voted"] += total
+            bucket_label = bucket or "Unknown"
+            ballot_stats["histogram"][bucket_label] = ballot_stats["histogram"].get(bucket_label, 0) + total
+        else:
+            ballot_stats[metric] = total
+
+    turnout = []
+    for name, ballot_stats in stats.items():
+        eligible = ballot_stats["eligible"]
+        histogram = sorted(ballot_stats["histogram"].items())
+        turnout.append(
+            {
+                "name": name,
+                "eligible": eligible,
+                "verified": ballot_stats["verified"],
+                "voted": ballot_stats["voted"],
+                "turnout_percent": round(100 * ballot_stats["voted"] / eligible, 1) if eligible else None,
+                "histogram": histogram,
+                "histogram_peak": max((count for _, count in histogram), default=0),
+            }
+        )
+    return {"ballots": turnout, "generated_at": datetime.utcnow()}
+
+
+def get_turnout_stats():
+    # The lock makes concurrent refreshes wait for a single recomputation
+    # instead of each running its own scan.
+    with _turnout_cache_lock:
+        now = time.monotonic()
+        if _turnout_cache["stats"] is None or now >= _turnout_cache["expires_at"]:
+            _turnout_cache["misses"] += 1
+            _turnout_cache["stats"] = compute_turnout_stats()
+            _turnout_cache["expires_at"] = now + TURNOUT_CACHE_SECONDS
+        else:
+            _turnout_cache["hits"] += 1
+        return _turnout_cache["stats"]
+
+# --- Instrumentation ---
+metrics_registry.describe("csu_request_duration_seconds", "histogram", "Request latency by endpoint.")
+metrics_registry.describe("csu_requests_total", "counter", "Requests served by endpoint and status.")
+metrics_registry.describe("csu_request_sql_duration_seconds", "histogram", "Time spent in SQL per request.")
+metrics_registry.describe("csu_sql_queries_total", "counter", "SQL statements executed by endpoint.")
+metrics_registry.describe("csu_template_render_seconds", "histogram", "Time spent rendering templates per request.")
+metrics_registry.describe("csu_function_duration_seconds", "histogram", "Duration of instrumented helpers.")
+metrics_registry.describe("csu_cache_hits_total", "counter", "Cache lookups answered from the cache.")
+metrics_registry.describe("csu_cache_misses_total", "counter", "Cache lookups that had to recompute.")
+metrics_registry.describe("csu_cache_entries", "gauge", "Entries currently held by the cache.")
+metrics_registry.describe("csu_metrics_enabled", "gauge", "1 when request instrumentation is enabled.")
+
+
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+    g.sql_query_count = 0
+    g.sql_seconds = 0.0
+    g.template_seconds = 0.0
+    g.template_started_at = []
+
+
+def record_request_metrics(response):
+    started_at = g.get("request_started_at")
+    if started_at is None:
+        return response
+    elapsed = time.perf_counter() - started_at
+    endpoint = request.endpoint or "unmatched"
+    if METRICS_ENABLED:
+        metrics_registry.observe("csu_request_duration_seconds", elapsed, endpoint=endpoint, method=request.method)
+        metrics_registry.increment("csu_requests_total", endpoint=endpoint, method=request.method, status=response.status_code)
+        metrics_registry.observe("csu_request_sql_duration_seconds", g.sql_seconds, endpoint=endpoint)
+        metrics_registry.increment("csu_sql_queries_total", g.sql_query_count, endpoint=endpoint)
+        metrics_registry.observe("csu_template_render_seconds", g.template_seconds, endpoint=endpoint)
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        app.logger.warning(
+            "Slow request: %s %s took %.1f ms (%d SQL statements in %.1f ms, templates %.1f ms)",
+            request.method,
+            request.path,
+            elapsed * 1000,
+            g.sql_query_count,
+            g.sql_seconds * 1000,
+            g.template_seconds * 1000,
+        )
+    return response
+
+
+def before_sql_statement(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context: a failed statement never reaches
+    # after_cursor_execute, so nothing is left behind to skew later timings.
+    if context is not None:
+        context.statement_started_at = time.perf_counter()
+
+
+def after_sql_statement(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, "statement_started_at", None)
+    if started_at is None:
+        return
+    if has_request_context() and "sql_query_count" in g:
+        g.sql_query_count += 1
+        g.sql_seconds += time.perf_counter() - started_at
+
+
+def before_template(sender, template, context, **extra):
+    if has_request_context() and "template_started_at" in g:
+        g.template_started_at.append(time.perf_counter())
+
+
+def after_template(sender, template, context, **extra):
+    if has_request_context() and g.get("template_started_at"):
+        g.template_seconds += time.perf_counter() - g.template_started_at.pop()
+
+
+def install_request_instrumentation():
+    # Hooks are only registered when something will read them, so a disabled
+    # deployment runs exactly the same request path as before.
+    app.before_request(start_request_timer)
+    app.after_request(record_request_metrics)
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", before_sql_statement)
+        event.listen(db.engine, "after_cursor_execute", after_sql_statement)
+    before_render_template.connect(before_template, app)
+    template_rendered.connect(after_template, app)
+
+
+def cache_metric_samples():
+    return [
+        ("csu_cache_hits_total", {"cache": "fragment"}, fragment_cache.hits),
+        ("csu_cache_misses_total", {"cache": "fragment"}, fragment_cache.misses),
+        ("csu_cache_entries", {"cache": "fragment"}, len(fragment_cache)),
+        ("csu_cache_hits_total", {"cache": "turnout"}, _turnout_cache["hits"]),
+        ("csu_cache_misses_total", {"cache": "turnout"}, _turnout_cache["misses"]),
+        ("csu_metrics_enabled", {}, 1 if METRICS_ENABLED else 0),
+    ]
+
+
+if METRICS_ENABLED or SLOW_REQUEST_MS:
+    install_request_instrumentation()
+
+# --- Email Verification ---
+def hash_verification_code(email, year, code):
+    key = app.config["SECRET_KEY"].encode()
+    return hmac.new(key, f"{year}\0{email}\0{code}".encode(), hashlib.sha256).hexdigest()
+
+
+def issue_verification_code(email, year):
+    now = datetime.utcnow()
+    record = VerificationCode.query.filter_by(email=email, year=year).first()
+    if (
+        record
+        and record.expires_at > now
+        and (now - record.created_at).total_seconds() < VERIFICATION_CODE_RESEND_SECONDS
+    ):
+        # A code went out moments ago; repeated submits should not flood the inbox.
+        return True
+    code = f"{secrets.randbelow(10 ** 6):06d}"
+    values = {
+        "code_hash": hash_verification_code(email, year, code),
+        "attempts": 0,
+        "created_at": now,
+        "expires_at": now + timedelta(minutes=VERIFICATION_CODE_MINUTES),
+    }
+    # Simultaneous submits for the same email (a double click) race to issue
+    # the code. Only one may win; the others are answered like a resend
+    # within the minute, so the code that was emailed stays valid.
+    if record:
+        replaced = (
+            VerificationCode.query.filter_by(id=record.id, created_at=record.created_at)
+            .update(values, synchronize_session=False)
+        )
+        if not replaced:
+            db.session.rollback()
+            return True
+    else:
+        db.session.add(VerificationCode(email=email, year=year, **values))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return True
+    message = Message(
+        subject="Your CSU Voting verification code",
+        recipients=[email],
+        body=(
+            f"Your verification code for {year} is {code}.\n\n"
+            f"It expires in {VERIFICATION_CODE_MINUTES} minutes. "
+            "If you did not request this code, you can ignore this email."
+        ),
+    )
+    return mailer.send(message)
+
+
+def check_verification_code(email, year, code):
+    record = VerificationCode.query.filter_by(email=email, year=year).first()
+    if not record or record.expires_at < datetime.utcnow():
+        return False, "Your verification code has expired. Request a new one."
+    # Each guess claims an attempt before it is compared, so simultaneous
+    # guesses cannot all slip under the limit on the same stale count.
+    claimed = (
+        VerificationCode.query.filter(
+            VerificationCode.id == record.id,
+            VerificationCode.attempts < VERIFICATION_CODE_MAX_ATTEMPTS,
+        )
+        .update({"attempts": VerificationCode.attempts + 1}, synchronize_session=False)
+    )
+    db.session.commit()
+    if not claimed:
+        return False, "Too many incorrect attempts. Request a new code."
+    if not hmac.compare_digest(record.code_hash, hash_verification_code(email, year, code)):
+        return False, "That verification code is not correct."
+    used = VerificationCode.query.filter_by(id=record.id).delete(synchronize_session=False)
+    db.session.commit()
+    if not used:
+        return False, "Your verification code has expired. Request a new one."
+    return True, None
+
+
+def start_voting_session(email, year, voter_record=None):
+    student = Student.query.filter_by(email=email).first()
+    if not student:
+        student = Student(email=email, year=year)
+        db.session.add(student)
+        db.session.commit()
+    if voter_record is None:
+        voter_record = VoterRecord.query.filter_by(method="email", identifier=email, year=year).first()
+    if voter_record and voter_record.has_voted:
+        return None
+    if not voter_record:
+        voter_record = VoterRecord(method="email", identifier=email, year=year)
+        db.session.add(voter_record)
+        db.session.commit()
+    session["year"] = year
+    session["email"] = email
+    session["voter_record_id"] = voter_record.id
+    session.pop("submission_token", None)
+    return voter_record
+
+
+def end_voting_session():
+    for key in ("email", "year", "voter_record_id", "submission_token"):
+        session.pop(key, None)
+
+
+def submission_outcome(submission_token):
+    if not submission_token:
+        return None
+    return db.session.execute(
+        select(BallotSubmission.outcome).where(BallotSubmission.token == submission_token)
+    ).scalar()
+
+
+def cast_ballot(voter_record_id, year, submission_token, responses):
+    """Record a ballot in one transaction. Returns False if the voter had already voted."""
+    cast_at = datetime.utcnow()
+    # Only one submission can flip has_voted, so two requests racing past the
+    # earlier checks cannot both insert votes.
+    claimed = (
+        VoterRecord.query.filter_by(id=voter_record_id, has_voted=False)
+        .update({"has_voted": True, "voted_at": cast_at}, synchronize_session=False)
+    )
+    if not claimed:
+        db.session.rollback()
+        return False
+    db.session.add(
+        BallotSubmission(
+            token=submission_token,
+            year=year,
+            voter_record_id=voter_record_id,
+            outcome="cast",
+            submitted_at=cast_at,
+        )
+    )
+    record_ballot_responses(year, responses)
+    db.session.commit()
+    return True
+
 # --- Decorators ---
 def login_required(f):
     @wraps(f)
@@ -451,6 +1608,10 @@ def verify_email():
         if selected_election not in elections:
             flash("Please choose a valid ballot.", "warning")
             return redirect(url_for("verify_email"))
+        state = ballot_state(selected_election)
+        if state != "open":
+            flash(ballot_unavailable_message(selected_election, elections[selected_election], state), "warning")
+            return redirect(url_for("verify_email"))
         session["year"] = selected_election
         full_name = (request.form.get("full_name") or "").strip()
         normalized_full_name = normalize_name(full_name)
@@ -464,13 +1625,7 @@ def verify_email():
                 "danger",
             )
             return redirect(url_for("verify_email"))
-        roster_exists = (
-            db.session.query(EligibleVoter.id)
-            .filter_by(year=selected_election)
-            .first()
-            is not None
-        )
-        if roster_exists:
+        if ballot_has_roster(selected_election):
             eligible_voter = EligibleVoter.query.filter_by(
                 year=selected_election,
                 email=email,
@@ -478,11 +1633,6 @@ def verify_email():
             if not eligible_voter or normalize_name(eligible_voter.full_name) != normalized_full_name:
                 flash("Your details could not be verified against the eligible voter list.", "danger")
                 return redirect(url_for("verify_email"))
-        student = Student.query.filter_by(email=email).first()
-        if not student:
-            student = Student(email=email, year=session["year"])
-            db.session.add(student)
-            db.session.commit()
         voter_record = VoterRecord.query.filter_by(
             method="email",
             identifier=email,
@@ -491,63 +1641,103 @@ def verify_email():
         if voter_record and voter_record.has_voted:
             flash("This email address has already been used to vote.", "warning")
             return redirect(url_for("verify_email"))
-        if not voter_record:
-            voter_record = VoterRecord(method="email", identifier=email, year=session["year"])
-            db.session.add(voter_record)
-            db.session.commit()
-        session["email"] = email
-        session["voter_record_id"] = voter_record.id
+        if EMAIL_VERIFICATION_ENABLED:
+            session.pop("voter_record_id", None)
+            session["pending_verification"] = {"email": email, "year": selected_election}
+            if not issue_verification_code(email, selected_election):
+                flash("We could not send a verification code right now. Please try again in a minute.", "danger")
+                return redirect(url_for("verify_email"))
+            flash(f"We emailed a 6-digit verification code to {email}.", "info")
+            return redirect(url_for("verify_code"))
+        start_voting_session(email, selected_election, voter_record)
+        return redirect(url_for("vote"))
+    selected_election = session.get("year")
+    open_elections = tuple(name for name in elections if ballot_state(name) == "open")
+    election_options_html = render_cached_fragment(
+        "_election_options.html",
+        (selected_election, open_elections),
+        elections=open_elections,
+        selected_election=selected_election,
+    )
+    return render_template("verify_email.html", election_options_html=election_options_html)
+
+@app.route("/verify_code", methods=["GET", "POST"])
+@login_required
+def verify_code():
+    pending = session.get("pending_verification")
+    if not pending:
+        return redirect(url_for("verify_email"))
+    state = ballot_state(pending["year"])
+    if state != "open":
+        session.pop("pending_verification", None)
+        flash(ballot_unavailable_message(pending["year"], load_candidates().get(pending["year"], {}), state), "warning")
+        return redirect(url_for("verify_email"))
+    if request.method == "POST":
+        if request.form.get("resend"):
+            if issue_verification_code(pending["email"], pending["year"]):
+                flash(f"A verification code was sent to {pending['email']}. Codes can be resent once a minute.", "info")
+            else:
+                flash("We could not send a verification code right now. Please try again in a minute.", "danger")
+            return redirect(url_for("verify_code"))
+        code = re.sub(r"\D", "", request.form.get("code") or "")
+        verified, error_message = check_verification_code(pending["email"], pending["year"], code)
+        if not verified:
+            flash(error_message, "danger")
+            return redirect(url_for("verify_code"))
+        session.pop("pending_verification", None)
+        if start_voting_session(pending["email"], pending["year"]) is None:
+            flash("This email address has already been used to vote.", "warning")
+            return redirect(url_for("verify_email"))
         return redirect(url_for("vote"))
-    return render_template("verify_email.html", elections=list(elections.keys()))
+    return render_template("verify_code.html", email=pending["email"], expires_minutes=VERIFICATION_CODE_MINUTES)
 
 @app.route("/vote", methods=["GET", "POST"])
 @login_required
 def vote():
+    submission_token = (request.form.get("submission_token") or "").strip()
+    if request.method == "POST" and submission_outcome(submission_token) == "cast":
+        # A repeated submit (double click, refresh, retry after a timeout) is
+        # answered from the recorded outcome without touching the vote tables.
+        end_voting_session()
+        return render_template("success.html")
     voter_record_id = session.get("voter_record_id")
     year = session.get("year")
     if not voter_record_id or not year:
         return redirect(url_for("index"))
-    voter_record = VoterRecord.query.filter_by(id=voter_record_id).first()
-    if not voter_record or voter_record.has_voted:
-        return render_template("message.html", title="Already Voted", message="Your vote has already been recorded.")
+    state = ballot_state(year)
+    if state != "open":
+        session.pop("voter_record_id", None)
+        message = ballot_unavailable_message(year, load_candidates().get(year, {}), state)
+        return render_template("message.html", title="Voting Closed" if state == "closed" else "Voting Not Open", message=message)
     ballots = load_candidates()
     ballot = ballots.get(year, {"questions": [], "description": ""})
     questions = ballot.get("questions", [])
     if request.method == "POST":
-        selected_candidates = []
-        answers_by_index = {}
-        for index, question in enumerate(questions):
-            if not question_is_visible(question, answers_by_index):
-                continue
-            question_choices = request.form.getlist(f"question_{index}_candidates")
-            write_in = request.form.get(f"question_{index}_write_in", "").strip()
-            if write_in:
-                question_choices.append(write_in)
-            question_max = question.get("max_selections", 1)
-            if len(question_choices) > question_max:
-                flash(
-                    f"'{question.get('prompt', f'Question {index + 1}')}' allows up to {question_max} selections.",
-                    "warning",
-                )
-                return redirect(url_for("vote"))
-            answers_by_index[index] = question_choices
-            selected_candidates.extend(question_choices)
-        if not selected_candidates:
+        if not submission_token or not hmac.compare_digest(submission_token.encode(), session.get("submission_token", "").encode()):
+            flash("This ballot form has expired. Please review your choices and submit again.", "warning")
+            return redirect(url_for("vote"))
+        responses, error_message = collect_ballot_responses(questions, request.form)
+        if error_message:
+            flash(error_message, "warning")
+            return redirect(url_for("vote"))
+        if not responses:
             flash("You must answer at least one question option to vote.", "warning")
             return redirect(url_for("vote"))
-        for candidate_name in selected_candidates:
-            new_vote = Vote(candidate=candidate_name)
-            db.session.add(new_vote)
-        voter_record.has_voted = True
-        db.session.add(voter_record)
-        db.session.commit()
-        session.pop("email", None)
-        session.pop("year", None)
-        session.pop("voter_record_id", None)
+        if not cast_ballot(voter_record_id, year, submission_token, responses):
+            if submission_outcome(submission_token) != "cast":
+                return render_template("message.html", title="Already Voted", message="Your vote has already been recorded.")
+        end_voting_session()
         return render_template("success.html")
+    voter_record = VoterRecord.query.filter_by(id=voter_record_id).first()
+    if not voter_record or voter_record.has_voted:
+        return render_template("message.html", title="Already Voted", message="Your vote has already been recorded.")
+    if not session.get("submission_token"):
+        session["submission_token"] = secrets.token_urlsafe(32)
+    questions_html = render_cached_fragment("_ballot_questions.html", (year,), questions=questions)
     return render_template(
         "vote.html",
-        questions=questions,
+        questions_html=questions_html,
+        submission_token=session["submission_token"],
         ballot_name=year,
         ballot_description=ballot.get("description") or "",
     )
@@ -582,12 +1772,50 @@ def admin_dashboard():
         .all()
     )
     election_names = list(candidates.keys())
+    roster_reports = {
+        report.year: {"id": report.id, "uploaded_at": report.uploaded_at, "counts": json.loads(report.counts)}
+        for report in db.session.execute(
+            select(RosterReport.id, RosterReport.year, RosterReport.uploaded_at, RosterReport.counts)
+        )
+    }
     return render_template(
         "admin_dashboard.html",
         candidates=candidates,
         voter_records=voter_records,
         election_names=election_names,
         roster_counts=roster_counts,
+        roster_reports=roster_reports,
+        roster_row_statuses=ROSTER_ROW_STATUSES,
+        voting_method_choices=VOTING_METHOD_CHOICES,
+        ballot_states={name: ballot_state(name) for name in election_names},
+        archives=ElectionArchive.query.order_by(ElectionArchive.archived_at.desc()).all(),
+        election_timezone=str(ELECTION_TIMEZONE),
+    )
+
+@app.route("/admin/metrics")
+def admin_metrics():
+    # Scrapers authenticate with METRICS_TOKEN; people use the admin session.
+    authorization = request.headers.get("Authorization", "")
+    token_ok = bool(METRICS_TOKEN) and hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode())
+    if not token_ok and "admin_logged_in" not in session:
+        if authorization:
+            return app.response_class("Unauthorized\n", status=401, mimetype="text/plain")
+        flash("You must be logged in to view this page.", "warning")
+        return redirect(url_for("admin_login"))
+    return app.response_class(
+        metrics_registry.render(cache_metric_samples()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+@app.route("/admin/turnout")
+@admin_login_required
+def turnout():
+    stats = get_turnout_stats()
+    return render_template(
+        "turnout.html",
+        turnout=stats["ballots"],
+        generated_at=stats["generated_at"],
+        cache_seconds=TURNOUT_CACHE_SECONDS,
     )
 
 @app.route("/admin/eligible_voters/upload", methods=["POST"])
@@ -612,30 +1840,53 @@ def upload_eligible_voters():
     except Exception:
         flash("Could not read the spreadsheet. Ensure it includes voter name and email columns.", "danger")
         return redirect(url_for("admin_dashboard"))
-    if not parsed_rows:
-        flash("No valid voters were found. Expected rows with voter name and CSU email.", "warning")
+    voters, report_rows, counts = validate_roster_rows(parsed_rows)
+    RosterReport.query.filter_by(year=year).delete(synchronize_session=False)
+    db.session.add(
+        RosterReport(
+            year=year,
+            uploaded_at=datetime.utcnow(),
+            file_name=excel_file.filename or "roster.xlsx",
+            counts=json.dumps(counts),
+            report_csv=roster_report_csv(report_rows),
+        )
+    )
+    if not voters:
+        db.session.commit()
+        flash("No valid voters were found. Expected rows with voter name and CSU email. See the validation report for each row.", "warning")
         return redirect(url_for("admin_dashboard"))
 
     EligibleVoter.query.filter_by(year=year).delete(synchronize_session=False)
-    seen = set()
-    inserted = 0
-    for row in parsed_rows:
-        key = (normalize_name(row["full_name"]), row["email"])
-        if key in seen:
-            continue
-        seen.add(key)
-        db.session.add(
-            EligibleVoter(
-                year=year,
-                full_name=row["full_name"],
-                email=row["email"],
-            )
-        )
-        inserted += 1
+    db.session.execute(insert(EligibleVoter), [dict(voter, year=year) for voter in voters])
+    bump_cache_version(ROSTER_VERSION_KEY)
     db.session.commit()
-    flash(f"Uploaded {inserted} eligible voter records for '{year}'.", "success")
+    cache_versions(refresh=True)
+    message = f"Uploaded {len(voters)} eligible voter records for '{year}'."
+    skipped = [
+        f"{label} ({counts[status]})"
+        for status, label in ROSTER_ROW_STATUSES
+        if status != "valid" and counts[status]
+    ]
+    if skipped:
+        message += f" Rows not loaded: {'; '.join(skipped)}. Download the validation report for details."
+    flash(message, "success" if not skipped else "warning")
     return redirect(url_for("admin_dashboard"))
 
+@app.route("/admin/eligible_voters/report/<int:report_id>")
+@admin_login_required
+def download_roster_report(report_id):
+    report = db.session.get(RosterReport, report_id)
+    if not report:
+        flash("Roster report not found.", "danger")
+        return redirect(url_for("admin_dashboard"))
+    download_name = f"{Path(report.file_name).stem}-validation.csv"
+    return send_file(
+        io.BytesIO(report.report_csv.encode()),
+        mimetype="text/csv",
+        as_attachment=True,
+        download_name=download_name,
+    )
+
 @app.route("/admin/election/add", methods=["POST"])
 @admin_login_required
 def add_election():
@@ -680,7 +1931,16 @@ def rename_election():
     save_candidates(candidates)
     VoterRecord.query.filter_by(year=current_name).update({"year": new_name}, synchronize_session=False)
     Student.query.filter_by(year=current_name).update({"year": new_name}, synchronize_session=False)
+    Vote.query.filter_by(year=current_name).update({"year": new_name}, synchronize_session=False)
+    RankedBallot.query.filter_by(year=current_name).update({"year": new_name}, synchronize_session=False)
+    WriteIn.query.filter_by(year=current_name).update({"year": new_name}, synchronize_session=False)
+    ResultSnapshot.query.filter_by(year=current_name).update({"year": new_name}, synchronize_session=False)
+    BallotSubmission.query.filter_by(year=current_name).update({"year": new_name}, synchronize_session=False)
+    RosterReport.query.filter_by(year=current_name).update({"year": new_name}, synchronize_session=False)
+    EligibleVoter.query.filter_by(year=current_name).update({"year": new_name}, synchronize_session=False)
+    bump_cache_version(ROSTER_VERSION_KEY)
     db.session.commit()
+    cache_versions(refresh=True)
     flash(f"Renamed election/ballot '{current_name}' to '{new_name}'.", "success")
     return redirect(url_for("admin_dashboard"))
 
@@ -697,12 +1957,48 @@ def delete_election():
         return redirect(url_for("admin_dashboard"))
     candidates.pop(election_name)
     save_candidates(candidates)
-    VoterRecord.query.filter_by(year=election_name).delete(synchronize_session=False)
-    Student.query.filter_by(year=election_name).delete(synchronize_session=False)
+    # A ballot recreated later under the same name must start empty.
+    delete_ballot_rows(election_name)
     db.session.commit()
-    flash(f"Deleted election/ballot '{election_name}' and its voter records.", "success")
+    flash(f"Deleted election/ballot '{election_name}' with its votes, roster and voter records.", "success")
     return redirect(url_for("admin_dashboard"))
 
+@app.route("/admin/election/archive", methods=["POST"])
+@admin_login_required
+def archive_election_route():
+    election_name = request.form.get("election_name", "").strip()
+    candidates = load_candidates()
+    if election_name not in candidates:
+        flash(f"Election/ballot '{election_name}' was not found.", "danger")
+        return redirect(url_for("admin_dashboard"))
+    ballot = candidates[election_name]
+    # Only closed ballots past the snapshot grace period can be archived, so no
+    # vote can land after its rows have been copied out.
+    question_results = None
+    if ballot_state(election_name) == "closed":
+        question_results = frozen_ballot_results(election_name, ballot)
+    if question_results is None:
+        flash(
+            f"'{election_name}' must be closed for at least {RESULT_SNAPSHOT_GRACE_SECONDS} seconds before it can be archived. "
+            "Set its closing time in the Ballot Builder.",
+            "warning",
+        )
+        return redirect(url_for("admin_dashboard"))
+    archive = archive_election(election_name, ballot, question_results)
+    candidates.pop(election_name)
+    save_candidates(candidates)
+    flash(f"Archived '{election_name}' ({archive.voters} voter(s)) to {archive.file_name}.", "success")
+    return redirect(url_for("admin_dashboard"))
+
+@app.route("/admin/archives/<int:archive_id>/download")
+@admin_login_required
+def download_archive(archive_id):
+    archive = db.session.get(ElectionArchive, archive_id)
+    if not archive:
+        flash("Archive not found.", "danger")
+        return redirect(url_for("admin_dashboard"))
+    return send_from_directory(archive_dir, archive.file_name, as_attachment=True)
+
 @app.route("/admin/add", methods=["POST"])
 @admin_login_required
 def add_candidate():
@@ -769,31 +2065,20 @@ def manual_vote():
     if year not in candidates:
         flash("Please choose a valid election/ballot.", "danger")
         return redirect(url_for("admin_dashboard"))
+    if ballot_state(year) == "closed":
+        flash(f"Voting for '{year}' has closed. Move its closing time to record more votes.", "warning")
+        return redirect(url_for("admin_dashboard"))
     if not email:
         flash("Student email is required.", "danger")
         return redirect(url_for("admin_dashboard"))
 
     # Get checked candidates from the form
     ballot = candidates[year]
-    selected_candidates = []
-    answers_by_index = {}
-    for index, question in enumerate(ballot.get("questions", [])):
-        if not question_is_visible(question, answers_by_index):
-            continue
-        question_choices = request.form.getlist(f"question_{index}_candidates")
-        write_in = request.form.get(f"question_{index}_write_in", "").strip()
-        if write_in:
-            question_choices.append(write_in)
-        question_max = question.get("max_selections", 1)
-        if len(question_choices) > question_max:
-            flash(
-                f"'{question.get('prompt', f'Question {index + 1}')}' allows up to {question_max} selections.",
-                "warning",
-            )
-            return redirect(url_for("admin_dashboard"))
-        answers_by_index[index] = question_choices
-        selected_candidates.extend(question_choices)
-    if not selected_candidates:
+    responses, error_message = collect_ballot_responses(ballot.get("questions", []), request.form)
+    if error_message:
+        flash(error_message, "warning")
+        return redirect(url_for("admin_dashboard"))
+    if not responses:
         flash("You must select at least one option to vote.", "warning")
         return redirect(url_for("admin_dashboard"))
 
@@ -817,16 +2102,16 @@ def manual_vote():
         db.session.flush()
 
     # Record the votes
-    for candidate_name in selected_candidates:
-        new_vote = Vote(candidate=candidate_name)
-        db.session.add(new_vote)
+    record_ballot_responses(year, responses)
 
     voter_record.has_voted = True
+    voter_record.voted_at = datetime.utcnow()
     db.session.add(voter_record)
     
     db.session.commit()
 
-    flash(f"Successfully cast {len(selected_candidates)} vote(s) on behalf of '{identifier}'.", "success")
+    selection_count = sum(len(response["choices"]) + (1 if response.get("write_in") else 0) for response in responses)
+    flash(f"Successfully cast {selection_count} vote(s) on behalf of '{identifier}'.", "success")
     return redirect(url_for("admin_dashboard"))
 
 @app.route("/admin/voter_records/update", methods=["POST"])
@@ -843,6 +2128,10 @@ def update_voter_record():
         flash("Voter record not found.", "danger")
         return redirect(url_for("admin_dashboard"))
 
+    if has_voted and not voter_record.has_voted:
+        voter_record.voted_at = datetime.utcnow()
+    elif not has_voted:
+        voter_record.voted_at = None
     voter_record.has_voted = has_voted
     db.session.add(voter_record)
     db.session.commit()
@@ -857,7 +2146,7 @@ def reset_voter_records():
     query = VoterRecord.query.filter_by(has_voted=True)
     if year:
         query = query.filter_by(year=year)
-    updated_count = query.update({"has_voted": False}, synchronize_session=False)
+    updated_count = query.update({"has_voted": False, "voted_at": None}, synchronize_session=False)
     db.session.commit()
     if year:
         flash(f"Reset {updated_count} voter record(s) for '{year}'.", "success")
@@ -869,6 +2158,9 @@ def reset_voter_records():
 @admin_login_required
 def reset_vote_results():
     deleted_count = Vote.query.delete(synchronize_session=False)
+    deleted_count += RankedBallot.query.delete(synchronize_session=False)
+    deleted_count += WriteIn.query.delete(synchronize_session=False)
+    ResultSnapshot.query.delete(synchronize_session=False)
     db.session.commit()
     flash(f"Deleted {deleted_count} recorded vote(s). Results are now reset.", "success")
     return redirect(url_for("admin_dashboard"))
@@ -889,6 +2181,8 @@ def update_ballot():
     option_blocks = request.form.getlist("question_options[]")
     show_if_questions = request.form.getlist("question_show_if_question[]")
     show_if_options = request.form.getlist("question_show_if_option[]")
+    voting_methods = request.form.getlist("question_voting_method[]")
+    seat_values = request.form.getlist("question_seats[]")
     for index in range(max(len(prompts), len(max_values), len(option_blocks), len(show_if_questions), len(show_if_options))):
         prompt = (prompts[index] if index < len(prompts) else "").strip()
         options_text = option_blocks[index] if index < len(option_blocks) else ""
@@ -916,6 +2210,14 @@ def update_ballot():
                 flash(f"Question {index + 1} has an invalid conditional branch rule.", "danger")
                 return redirect(url_for("admin_dashboard"))
             question_data["show_if"] = show_if
+        question_data.update(
+            parse_voting_method_rule(
+                {
+                    "voting_method": voting_methods[index] if index < len(voting_methods) else "",
+                    "seats": seat_values[index] if index < len(seat_values) else None,
+                }
+            )
+        )
         questions.append(question_data)
 
     if not questions:
@@ -931,8 +2233,23 @@ def update_ballot():
     if not questions:
         flash("At least one question is required for a ballot.", "danger")
         return redirect(url_for("admin_dashboard"))
+    schedule = {}
+    for schedule_key in ("opens_at", "closes_at"):
+        raw_value = (request.form.get(schedule_key) or "").strip()
+        schedule[schedule_key] = parse_schedule_time(raw_value)
+        if raw_value and schedule[schedule_key] is None:
+            flash("Opening and closing times must be valid dates and times.", "danger")
+            return redirect(url_for("admin_dashboard"))
+    if schedule["opens_at"] and schedule["closes_at"] and schedule["closes_at"] <= schedule["opens_at"]:
+        flash("The closing time must be after the opening time.", "danger")
+        return redirect(url_for("admin_dashboard"))
     candidates[ballot_name]["description"] = description
     candidates[ballot_name]["questions"] = questions
+    for schedule_key, schedule_value in schedule.items():
+        if schedule_value:
+            candidates[ballot_name][schedule_key] = schedule_value
+        else:
+            candidates[ballot_name].pop(schedule_key, None)
     save_candidates(candidates)
     flash(f"Updated ballot builder settings for '{ballot_name}'.", "success")
     return redirect(url_for("admin_dashboard"))
@@ -940,11 +2257,98 @@ def update_ballot():
 @app.route("/results")
 @admin_login_required
 def results():
-    vote_counts = db.session.query(
+    ballots = load_candidates()
+    ballot_results = []
+    for ballot_name, ballot in ballots.items():
+        # Closed ballots are read from their frozen snapshot, not the vote tables.
+        frozen_results = None
+        if ballot_state(ballot_name) == "closed":
+            frozen_results = frozen_ballot_results(ballot_name, ballot)
+        ballot_results.append(
+            {
+                "name": ballot_name,
+                "questions": frozen_results if frozen_results is not None else compute_ballot_results(ballot_name, ballot),
+                "frozen": frozen_results is not None,
+                "closes_at": format_schedule_time(ballot.get("closes_at")),
+            }
+        )
+    for archive in ElectionArchive.query.order_by(ElectionArchive.archived_at.desc()):
+        ballot_results.append(
+            {
+                "name": archive.year,
+                "questions": json.loads(archive.results),
+                "frozen": True,
+                "archived_at": archive.archived_at,
+            }
+        )
+    # Votes recorded before ballots were tracked per question.
+    unassigned_counts = db.session.query(
         Vote.candidate, 
         func.count(Vote.candidate).label('total_votes')
-    ).group_by(Vote.candidate).order_by(func.count(Vote.candidate).desc()).all()
-    return render_template("results.html", results=vote_counts)
+    ).filter(Vote.year.is_(None)).group_by(Vote.candidate).order_by(func.count(Vote.candidate).desc()).all()
+    return render_template("results.html", ballot_results=ballot_results, results=unassigned_counts)
+
+# --- Backup Commands ---
+backup_cli = click.Group("backup", help="Snapshot, verify and restore the vote database and ballot file.")
+app.cli.add_command(backup_cli)
+
+
+def sqlite_database_path():
+    url = db.engine.url
+    if url.get_backend_name() != "sqlite" or not url.database:
+        raise click.ClickException("Backups are only supported for the SQLite database.")
+    return Path(url.database)
+
+
+@backup_cli.command("create")
+@click.option("--pages", default=256, show_default=True, help="Database pages copied per backup step.")
+def backup_create(pages):
+    snapshot_dir = backup.create_snapshot(sqlite_database_path(), ballots_path, backup_dir, pages_per_step=pages)
+    click.echo(f"Wrote {snapshot_dir}")
+
+
+@backup_cli.command("schedule")
+@click.option("--interval", default=900, show_default=True, help="Seconds between snapshots.")
+@click.option("--keep", default=96, show_default=True, help="Number of snapshots to keep.")
+def backup_schedule(interval, keep):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    database_path = sqlite_database_path()
+    click.echo(f"Writing a snapshot to {backup_dir} every {interval} seconds, keeping {keep}.")
+    backup.run_schedule(
+        lambda: backup.create_snapshot(database_path, ballots_path, backup_dir),
+        interval_seconds=interval,
+        keep=keep,
+        backup_root=backup_dir,
+    )
+
+
+@backup_cli.command("list")
+def backup_list():
+    for snapshot_dir in backup.list_snapshots(backup_dir):
+        click.echo(snapshot_dir)
+
+
+@backup_cli.command("verify")
+@click.argument("snapshot_dir", type=click.Path(exists=True, file_okay=False, path_type=Path))
+def backup_verify(snapshot_dir):
+    problems = backup.verify_snapshot(snapshot_dir)
+    for problem in problems:
+        click.echo(problem, err=True)
+    if problems:
+        raise click.ClickException(f"{snapshot_dir} failed verification.")
+    click.echo(f"{snapshot_dir} is intact.")
+
+
+@backup_cli.command("restore")
+@click.argument("snapshot_dir", type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.confirmation_option(prompt="This replaces the live database and ballot file. Continue?")
+def backup_restore(snapshot_dir):
+    try:
+        backup.restore_snapshot(snapshot_dir, sqlite_database_path(), ballots_path)
+    except backup.BackupError as exc:
+        raise click.ClickException(str(exc))
+    fragment_cache.clear()
+    click.echo(f"Restored {snapshot_dir}. Restart the app so every worker reloads its caches.")
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
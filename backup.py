@@ -0,0 +1,237 @@
+"""Online snapshots of the SQLite database and the ballot configuration.
+
+A snapshot is a directory holding a copy of votes.db, the candidates.json in
+effect when it was taken, and a manifest.json with SHA-256 checksums of both.
+The database is copied with SQLite's online backup API a few pages at a time,
+sleeping between steps so voters writing to the live database are never
+blocked for long. The ballot file is read before and after the copy; if it
+changed in between the snapshot is retaken so the two always match.
+
+The app exposes these as Flask CLI commands:
+
+    flask --app app backup create
+    flask --app app backup schedule --interval 900 --keep 96
+    flask --app app backup verify data/backups/snapshot-20261019T120000123456Z
+    flask --app app backup restore data/backups/snapshot-20261019T120000123456Z
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DATABASE_FILE_NAME = "votes.db"
+CONFIG_FILE_NAME = "candidates.json"
+MANIFEST_FILE_NAME = "manifest.json"
+SNAPSHOT_PREFIX = "snapshot-"
+
+
+class BackupError(Exception):
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source_file:
+        for chunk in iter(lambda: source_file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_config(config_path):
+    """Return (bytes, sha256) of the ballot file, or (None, None) if it is missing."""
+    try:
+        config_bytes = Path(config_path).read_bytes()
+    except FileNotFoundError:
+        return None, None
+    return config_bytes, hashlib.sha256(config_bytes).hexdigest()
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def copy_database(source_path, target_path, pages_per_step=256, step_sleep_seconds=0.01, max_restarts=5):
+    """Copy a live database with the online backup API.
+
+    SQLite restarts a stepped backup whenever another connection writes to
+    the source. If that happens more than ``max_restarts`` times the copy is
+    finished in a single step instead, which holds the read lock for the whole
+    copy but is guaranteed to complete.
+    """
+    restarts = 0
+    last_copied = 0
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_copied
+        copied = total - remaining
+        if copied < last_copied:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _TooManyRestarts()
+        last_copied = copied
+
+    source = sqlite3.connect(source_path, timeout=30)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            with target:
+                source.backup(target, pages=pages_per_step, progress=progress, sleep=step_sleep_seconds)
+        except _TooManyRestarts:
+            logger.warning("Backup restarted %d times under write load; copying in one step", restarts)
+            with target:
+                source.backup(target)
+        check = target.execute("PRAGMA quick_check").fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+    if check != "ok":
+        raise BackupError(f"Backup copy failed its integrity check: {check}")
+
+
+def create_snapshot(db_path, config_path, backup_root, pages_per_step=256, step_sleep_seconds=0.01, max_attempts=3):
+    """Take a snapshot and return its directory."""
+    backup_root = Path(backup_root)
+    backup_root.mkdir(parents=True, exist_ok=True)
+    created_at = datetime.now(timezone.utc)
+    # Microseconds keep a manual snapshot taken while the scheduler runs from
+    # landing on the same name, and each run copies into its own private
+    # partial directory.
+    snapshot_dir = backup_root / f"{SNAPSHOT_PREFIX}{created_at:%Y%m%dT%H%M%S%fZ}"
+    partial_dir = Path(tempfile.mkdtemp(prefix=f"{snapshot_dir.name}-", suffix=".partial", dir=backup_root))
+
+    try:
+        for attempt in range(1, max_attempts + 1):
+            (partial_dir / DATABASE_FILE_NAME).unlink(missing_ok=True)
+            config_before, digest_before = read_config(config_path)
+            copy_database(db_path, partial_dir / DATABASE_FILE_NAME, pages_per_step, step_sleep_seconds)
+            config_after, digest_after = read_config(config_path)
+            if digest_before == digest_after:
+                break
+            logger.warning("Ballot configuration changed during backup attempt %d; retrying", attempt)
+        else:
+            raise BackupError(f"Ballot configuration kept changing; gave up after {max_attempts} attempts")
+
+        files = {DATABASE_FILE_NAME: partial_dir / DATABASE_FILE_NAME}
+        if config_after is not None:
+            (partial_dir / CONFIG_FILE_NAME).write_bytes(config_after)
+            files[CONFIG_FILE_NAME] = partial_dir / CONFIG_FILE_NAME
+        manifest = {
+            "created_at": created_at.isoformat(),
+            "source_database": str(db_path),
+            "source_config": str(config_path),
+            "files": {
+                name: {"sha256": file_sha256(path), "size": path.stat().st_size}
+                for name, path in files.items()
+            },
+        }
+        (partial_dir / MANIFEST_FILE_NAME).write_text(json.dumps(manifest, indent=2))
+        os.replace(partial_dir, snapshot_dir)
+    except BaseException:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        raise
+    return snapshot_dir
+
+
+def verify_snapshot(snapshot_dir):
+    """Return a list of problems with the snapshot; empty when it is intact."""
+    snapshot_dir = Path(snapshot_dir)
+    manifest_path = snapshot_dir / MANIFEST_FILE_NAME
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, json.JSONDecodeError) as exc:
+        return [f"Cannot read {manifest_path}: {exc}"]
+    problems = []
+    files = manifest.get("files", {})
+    if DATABASE_FILE_NAME not in files:
+        problems.append(f"Manifest does not list {DATABASE_FILE_NAME}")
+    for name, expected in files.items():
+        path = snapshot_dir / name
+        if not path.exists():
+            problems.append(f"{name} is missing")
+        elif file_sha256(path) != expected.get("sha256"):
+            problems.append(f"{name} does not match its checksum")
+    if not problems:
+        connection = sqlite3.connect(snapshot_dir / DATABASE_FILE_NAME)
+        try:
+            check = connection.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            connection.close()
+        if check != "ok":
+            problems.append(f"{DATABASE_FILE_NAME} failed its integrity check: {check}")
+    return problems
+
+
+def restore_snapshot(snapshot_dir, db_path, config_path, pages_per_step=256, step_sleep_seconds=0.01):
+    """Replace the live database and ballot file with a verified snapshot.
+
+    The database is written back through the backup API rather than copied
+    over the file, so open connections and any WAL file stay consistent.
+    Stop accepting votes before restoring; anything written since the
+    snapshot was taken is lost.
+    """
+    snapshot_dir = Path(snapshot_dir)
+    problems = verify_snapshot(snapshot_dir)
+    if problems:
+        raise BackupError("Snapshot failed verification: " + "; ".join(problems))
+    source = sqlite3.connect(snapshot_dir / DATABASE_FILE_NAME)
+    target = sqlite3.connect(db_path, timeout=30)
+    try:
+        with target:
+            source.backup(target, pages=pages_per_step, sleep=step_sleep_seconds)
+    finally:
+        target.close()
+        source.close()
+    snapshot_config = snapshot_dir / CONFIG_FILE_NAME
+    if snapshot_config.exists():
+        config_path = Path(config_path)
+        temporary_path = config_path.with_name(f"{config_path.name}.restore")
+        shutil.copyfile(snapshot_config, temporary_path)
+        os.replace(temporary_path, config_path)
+
+
+def list_snapshots(backup_root):
+    backup_root = Path(backup_root)
+    if not backup_root.exists():
+        return []
+    return sorted(
+        path for path in backup_root.iterdir()
+        if path.is_dir() and path.name.startswith(SNAPSHOT_PREFIX) and not path.name.endswith(".partial")
+    )
+
+
+def prune_snapshots(backup_root, keep):
+    """Delete all but the newest ``keep`` snapshots and return the removed paths."""
+    snapshots = list_snapshots(backup_root)
+    removed = snapshots[:-keep] if keep > 0 else []
+    for path in removed:
+        shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+
+def run_schedule(take_snapshot, interval_seconds, keep, backup_root, max_runs=None):
+    """Take a snapshot every ``interval_seconds`` until stopped.
+
+    A failed run is logged and retried at the next interval rather than
+    ending the loop.
+    """
+    runs = 0
+    while max_runs is None or runs < max_runs:
+        started = time.monotonic()
+        try:
+            snapshot_dir = take_snapshot()
+            logger.info("Wrote snapshot %s", snapshot_dir)
+            prune_snapshots(backup_root, keep)
+        except (BackupError, OSError, sqlite3.Error):
+            logger.exception("Scheduled backup failed")
+        runs += 1
+        if max_runs is not None and runs >= max_runs:
+            break
+        time.sleep(max(interval_seconds - (time.monotonic() - started), 0))
@@ -0,0 +1,82 @@
+"""Requests per second on GET /vote with the rendered fragment cache off and on.
+
+Runs against a throwaway database and ballot file, so it never touches the
+real data directory:
+
+    python benchmarks/bench_vote_page.py --questions 12 --options 8 --seconds 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def build_ballot(question_count, option_count):
+    questions = []
+    for index in range(question_count):
+        question = {
+            "prompt": f"Question {index + 1}",
+            "max_selections": 2,
+            "options": [f"Candidate {index + 1}-{option + 1}" for option in range(option_count)],
+        }
+        if index % 3 == 2:
+            question["show_if"] = {"question_number": index, "option": f"Candidate {index}-1"}
+        questions.append(question)
+    return {"Benchmark Election": {"description": "Benchmark ballot.", "questions": questions}}
+
+
+def measure(client, seconds):
+    completed = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        response = client.get("/vote")
+        if response.status_code != 200:
+            raise SystemExit(f"GET /vote returned {response.status_code}")
+        completed += 1
+    return completed / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=12)
+    parser.add_argument("--options", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="csu-voting-bench-"))
+    os.environ["DB_PATH"] = str(work_dir / "votes.db")
+    os.environ["CANDIDATES_PATH"] = str(work_dir / "candidates.json")
+    os.environ["EMAIL_VERIFICATION"] = "0"
+    (work_dir / "candidates.json").write_text(json.dumps(build_ballot(args.questions, args.options)))
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import app as voting_app
+
+    client = voting_app.app.test_client()
+    client.post("/login", data={"password": voting_app.VOTING_PASSWORD})
+    response = client.post(
+        "/verify_email",
+        data={"year": "Benchmark Election", "full_name": "Bench Voter", "email": "bbvoter"},
+    )
+    if response.status_code != 302 or not response.location.endswith("/vote"):
+        raise SystemExit("Could not verify the benchmark voter.")
+
+    cache = voting_app.fragment_cache
+    configured_entries = cache.max_entries
+    cache.max_entries = 0
+    cache.clear()
+    uncached = measure(client, args.seconds)
+    cache.max_entries = configured_entries or 256
+    cached = measure(client, args.seconds)
+
+    print(f"Ballot: {args.questions} questions x {args.options} options")
+    print(f"GET /vote without fragment cache: {uncached:8.1f} req/s")
+    print(f"GET /vote with fragment cache:    {cached:8.1f} req/s")
+    print(f"Speedup: {cached / uncached:.2f}x (cache hits {cache.hits}, misses {cache.misses})")
+
+
+if __name__ == "__main__":
+    main()
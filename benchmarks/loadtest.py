@@ -0,0 +1,540 @@
+"""Election-day load test for the public_login -> verify_email -> vote flow.
+
+Builds a synthetic roster and a ballot with conditional (show_if) and ranked
+questions, sets them up through the admin pages, then drives many concurrent
+simulated voters through the full flow and checks the stored tallies against
+what the voters actually submitted. A share of voters (--resubmit-rate)
+submit their ballot a second time, as a double click or refresh would, and
+must get the same confirmation without adding votes. In-process runs suppress real email and
+read each voter's verification code from Flask-Mail's dispatch signal.
+
+In-process, against a throwaway database (default):
+
+    python benchmarks/loadtest.py --roster 20000 --voters 2000 --concurrency 32
+
+Against a running server, e.g. gunicorn -w 4 -b 127.0.0.1:8000 app:app. Pass
+--db-path to the server's SQLite file to also verify the tallies:
+
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8000 --db-path data/votes.db
+
+The server cannot hand out emailed codes, so start it with EMAIL_VERIFICATION=0.
+"""
+import argparse
+import http.client
+import io
+import os
+import random
+import re
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+from xml.sax.saxutils import escape
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+STEPS = ("login", "verify_page", "verify", "verify_code", "vote_page", "vote", "resubmit")
+SUBMISSION_TOKEN_PATTERN = re.compile(r'name="submission_token" value="([^"]+)"')
+CODE_WAIT_SECONDS = 30
+STARTUP_TIMEOUT_SECONDS = 30
+
+
+# --- Synthetic data ---
+def letters_for(number, width=5):
+    chars = []
+    for _ in range(width):
+        number, remainder = divmod(number, 26)
+        chars.append(chr(ord("a") + remainder))
+    return "".join(reversed(chars))
+
+
+def roster_entry(index):
+    suffix = letters_for(index)
+    return {"full_name": f"Load Voter {suffix}", "email_local": f"lv{suffix}"}
+
+
+def build_questions():
+    return [
+        {"prompt": "President", "max_selections": 1, "options": [f"President {i}" for i in range(1, 6)]},
+        {
+            "prompt": "Vice President",
+            "max_selections": 1,
+            "options": [f"Vice President {i}" for i in range(1, 4)],
+            "show_if": {"question_number": 1, "option": "President 1"},
+        },
+        {"prompt": "Senators", "max_selections": 3, "options": [f"Senator {i}" for i in range(1, 9)]},
+        {
+            "prompt": "Senate Chair",
+            "max_selections": 1,
+            "options": ["Chair A", "Chair B"],
+            "show_if": {"question_number": 3, "option": "Senator 2"},
+        },
+        {
+            "prompt": "Treasurer",
+            "max_selections": 1,
+            "options": [f"Treasurer {i}" for i in range(1, 5)],
+            "voting_method": "irv",
+        },
+    ]
+
+
+def build_roster_xlsx(row_count):
+    def cell(ref, value):
+        return f'<c r="{ref}" t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+
+    rows = ['<row r="1">' + cell("A1", "Full Name") + cell("B1", "Email") + "</row>"]
+    for index in range(row_count):
+        entry = roster_entry(index)
+        row_number = index + 2
+        rows.append(
+            f'<row r="{row_number}">'
+            + cell(f"A{row_number}", entry["full_name"])
+            + cell(f"B{row_number}", f"{entry['email_local']}@student.csuniv.edu")
+            + "</row>"
+        )
+    main_ns = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    rel_ns = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            "</Types>",
+        )
+        archive.writestr(
+            "xl/workbook.xml",
+            f'<?xml version="1.0" encoding="UTF-8"?><workbook xmlns="{main_ns}" xmlns:r="{rel_ns}">'
+            '<sheets><sheet name="Roster" sheetId="1" r:id="rId1"/></sheets></workbook>',
+        )
+        archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+            "</Relationships>",
+        )
+        archive.writestr(
+            "xl/worksheets/sheet1.xml",
+            f'<?xml version="1.0" encoding="UTF-8"?><worksheet xmlns="{main_ns}"><sheetData>'
+            + "".join(rows)
+            + "</sheetData></worksheet>",
+        )
+    return buffer.getvalue()
+
+
+def choose_ballot(questions, rng):
+    """Pick answers the way a voter would, honouring show_if branches."""
+    form = {}
+    answers = {}
+    for index, question in enumerate(questions):
+        show_if = question.get("show_if")
+        if show_if and show_if["option"] not in answers.get(show_if["question_number"] - 1, []):
+            continue
+        options = question["options"]
+        if question.get("voting_method") == "irv":
+            ranking = rng.sample(options, rng.randint(1, len(options)))
+            for rank, option in enumerate(ranking, start=1):
+                form[f"question_{index}_rank_{options.index(option)}"] = str(rank)
+            answers[index] = ranking
+            continue
+        picks = rng.sample(options, rng.randint(1, question["max_selections"]))
+        form[f"question_{index}_candidates"] = picks
+        answers[index] = picks
+    return form, answers
+
+
+def ballot_form(ballot_name, questions, description):
+    """The /admin/ballot/update form that defines ``questions``."""
+    return {
+        "ballot_name": ballot_name,
+        "description": description,
+        "question_prompt[]": [question["prompt"] for question in questions],
+        "question_max_selections[]": [str(question["max_selections"]) for question in questions],
+        "question_options[]": ["\n".join(question["options"]) for question in questions],
+        "question_show_if_question[]": [str(question["show_if"]["question_number"]) if question.get("show_if") else "" for question in questions],
+        "question_show_if_option[]": [question["show_if"]["option"] if question.get("show_if") else "" for question in questions],
+        "question_voting_method[]": [question.get("voting_method", "plurality") for question in questions],
+        "question_seats[]": ["1" for _ in questions],
+    }
+
+
+# --- Transport ---
+class TestClientSession:
+    def __init__(self, flask_app):
+        self.client = flask_app.test_client()
+
+    def request(self, method, path, data=None, files=None):
+        if files:
+            data = dict(data or {})
+            data.update({name: (io.BytesIO(content), filename) for name, (filename, content) in files.items()})
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.headers.get("Location", ""), response.get_data(as_text=True)
+
+
+class HttpSession:
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        self.cookies = {}
+
+    def request(self, method, path, data=None, files=None):
+        headers = {}
+        body = None
+        if files:
+            boundary = f"loadtest{random.getrandbits(64):x}"
+            chunks = []
+            for name, value in (data or {}).items():
+                chunks.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+            for name, (filename, content) in files.items():
+                chunks.append(
+                    f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                    "Content-Type: application/octet-stream\r\n\r\n".encode()
+                    + content
+                    + b"\r\n"
+                )
+            chunks.append(f"--{boundary}--\r\n".encode())
+            body = b"".join(chunks)
+            headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+        elif data is not None:
+            body = urlencode(data, doseq=True).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in self.cookies.items())
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        payload = response.read().decode("utf-8", "replace")
+        for header, value in response.getheaders():
+            if header.lower() == "set-cookie":
+                name, _, rest = value.partition("=")
+                self.cookies[name.strip()] = rest.split(";", 1)[0]
+        return response.status, response.getheader("Location", ""), payload
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_until_ready(server):
+    """Poll a server started as a subprocess until /login answers.
+
+    ``server`` is a dict with the ``process``, its base ``url`` and the
+    ``log`` file its output goes to.
+    """
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if server["process"].poll() is not None:
+            raise SystemExit(f"{server['url']} exited during startup; see {server['log']}")
+        try:
+            status, _, _ = HttpSession(server["url"]).request("GET", "/login")
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server["process"].terminate()
+    raise SystemExit(f"{server['url']} did not start within {STARTUP_TIMEOUT_SECONDS}s; see {server['log']}")
+
+
+# --- Load test ---
+class CodeInbox:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.codes = {}
+
+    def deliver(self, message, **extra):
+        match = re.search(r"\b(\d{6})\b", message.body or "")
+        if not match:
+            return
+        with self.condition:
+            for recipient in message.recipients:
+                self.codes[recipient] = match.group(1)
+            self.condition.notify_all()
+
+    def wait_for(self, recipient):
+        with self.condition:
+            self.condition.wait_for(lambda: recipient in self.codes, timeout=CODE_WAIT_SECONDS)
+            return self.codes.pop(recipient, None)
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {step: [] for step in STEPS}
+        self.failures = {}
+        self.completed_voters = 0
+        self.expected_plurality = {}
+        self.expected_ranked = {}
+
+    def record(self, step, seconds):
+        with self.lock:
+            self.latencies[step].append(seconds)
+
+    def fail(self, reason):
+        with self.lock:
+            self.failures[reason] = self.failures.get(reason, 0) + 1
+
+
+def timed_request(recorder, step, session, method, path, data=None, expect=(200,)):
+    started = time.perf_counter()
+    status, location, body = session.request(method, path, data=data)
+    recorder.record(step, time.perf_counter() - started)
+    if status not in expect:
+        recorder.fail(f"{step}: HTTP {status}")
+        return None
+    return status, location, body
+
+
+def run_voter(make_session, recorder, inbox, ballot_name, questions, voting_password, voter_index, seed, resubmit_rate):
+    rng = random.Random(seed + voter_index)
+    entry = roster_entry(voter_index)
+    session = make_session()
+    if not timed_request(recorder, "login", session, "POST", "/login", {"password": voting_password}, expect=(302,)):
+        return
+    if not timed_request(recorder, "verify_page", session, "GET", "/verify_email"):
+        return
+    result = timed_request(
+        recorder,
+        "verify",
+        session,
+        "POST",
+        "/verify_email",
+        {"year": ballot_name, "full_name": entry["full_name"], "email": entry["email_local"]},
+        expect=(302,),
+    )
+    if not result:
+        return
+    if result[1].endswith("/verify_code"):
+        if inbox is None:
+            recorder.fail("verify: server requires emailed codes (run it with EMAIL_VERIFICATION=0)")
+            return
+        code = inbox.wait_for(f"{entry['email_local']}@student.csuniv.edu")
+        if code is None:
+            recorder.fail("verify_code: no code delivered")
+            return
+        result = timed_request(recorder, "verify_code", session, "POST", "/verify_code", {"code": code}, expect=(302,))
+        if not result:
+            return
+    if not result[1].endswith("/vote"):
+        recorder.fail("verify: not sent to /vote")
+        return
+    result = timed_request(recorder, "vote_page", session, "GET", "/vote")
+    if not result:
+        return
+    token_match = SUBMISSION_TOKEN_PATTERN.search(result[2])
+    if not token_match:
+        recorder.fail("vote_page: no submission token")
+        return
+    form, answers = choose_ballot(questions, rng)
+    form["submission_token"] = token_match.group(1)
+    result = timed_request(recorder, "vote", session, "POST", "/vote", form)
+    if not result:
+        return
+    if "Thank You" not in result[2]:
+        recorder.fail("vote: ballot not accepted")
+        return
+    if rng.random() < resubmit_rate:
+        result = timed_request(recorder, "resubmit", session, "POST", "/vote", form)
+        if result and "Thank You" not in result[2]:
+            recorder.fail("resubmit: duplicate not answered with the original confirmation")
+    with recorder.lock:
+        recorder.completed_voters += 1
+        for index, choices in answers.items():
+            if questions[index].get("voting_method") == "irv":
+                recorder.expected_ranked[index] = recorder.expected_ranked.get(index, 0) + 1
+                continue
+            for choice in choices:
+                key = (index, choice)
+                recorder.expected_plurality[key] = recorder.expected_plurality.get(key, 0) + 1
+
+
+def set_up_election(session, admin_user, admin_pass, ballot_name, questions, roster_rows):
+    status, _, _ = session.request("POST", "/admin/login", {"username": admin_user, "password": admin_pass})
+    if status != 302:
+        raise SystemExit("Admin login failed; check ADMIN_USER / ADMIN_PASS.")
+    session.request("POST", "/admin/election/add", {"election_name": ballot_name})
+    session.request("POST", "/admin/ballot/update", ballot_form(ballot_name, questions, "Synthetic load-test ballot."))
+    started = time.perf_counter()
+    session.request(
+        "POST",
+        "/admin/eligible_voters/upload",
+        {"year": ballot_name},
+        files={"eligible_voters_excel": ("roster.xlsx", build_roster_xlsx(roster_rows))},
+    )
+    return time.perf_counter() - started
+
+
+def verify_tallies(db_path, ballot_name, recorder):
+    connection = sqlite3.connect(db_path)
+    try:
+        stored_plurality = {
+            (question_index, candidate): total
+            for question_index, candidate, total in connection.execute(
+                "SELECT question_index, candidate, COUNT(*) FROM vote WHERE year = ? GROUP BY question_index, candidate",
+                (ballot_name,),
+            )
+        }
+        stored_ranked = dict(
+            connection.execute(
+                "SELECT question_index, COUNT(*) FROM ranked_ballot WHERE year = ? GROUP BY question_index",
+                (ballot_name,),
+            ).fetchall()
+        )
+        voted_records = connection.execute(
+            "SELECT COUNT(*) FROM voter_record WHERE year = ? AND has_voted = 1",
+            (ballot_name,),
+        ).fetchone()[0]
+    finally:
+        connection.close()
+    problems = []
+    if stored_plurality != recorder.expected_plurality:
+        mismatched = set(stored_plurality.items()) ^ set(recorder.expected_plurality.items())
+        problems.append(f"{len(mismatched)} plurality tally entries differ")
+    if stored_ranked != recorder.expected_ranked:
+        problems.append(f"ranked ballot counts {stored_ranked} != expected {recorder.expected_ranked}")
+    if voted_records != recorder.completed_voters:
+        problems.append(f"{voted_records} voter records marked voted, {recorder.completed_voters} voters finished")
+    return problems
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roster", type=int, default=10000, help="eligible voter rows to upload")
+    parser.add_argument("--voters", type=int, default=1000, help="voters that go through the full flow")
+    parser.add_argument("--concurrency", type=int, default=32, help="simultaneous simulated voters")
+    parser.add_argument("--resubmit-rate", type=float, default=0.1, help="share of voters who submit their ballot twice")
+    parser.add_argument("--seed", type=int, default=2026)
+    parser.add_argument("--base-url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--db-path", help="SQLite file used to verify tallies in --base-url mode")
+    args = parser.parse_args()
+    if args.voters > args.roster:
+        parser.error("--voters cannot exceed --roster")
+
+    ballot_name = f"Load Test {int(time.time()) % 100000}"
+    questions = build_questions()
+
+    if args.base_url:
+        from dotenv import load_dotenv
+
+        load_dotenv(REPO_ROOT / "csu-voting.env")
+        voting_password = os.getenv("VOTING_PASSWORD")
+        admin_user = os.getenv("ADMIN_USER", "admin")
+        admin_pass = os.getenv("ADMIN_PASS", "password")
+        db_path = args.db_path
+        lock_errors = None
+        inbox = None
+
+        def make_session():
+            return HttpSession(args.base_url)
+    else:
+        work_dir = Path(tempfile.mkdtemp(prefix="csu-voting-loadtest-"))
+        os.environ["DB_PATH"] = str(work_dir / "votes.db")
+        os.environ["CANDIDATES_PATH"] = str(work_dir / "candidates.json")
+        os.environ.pop("DATABASE_URL", None)
+        os.environ["MAIL_SUPPRESS_SEND"] = "1"
+        sys.path.insert(0, str(REPO_ROOT))
+        os.chdir(REPO_ROOT)
+        import app as voting_app
+        from flask import got_request_exception
+        from flask_mail import email_dispatched
+
+        voting_password = voting_app.VOTING_PASSWORD
+        admin_user = voting_app.ADMIN_USER
+        admin_pass = voting_app.ADMIN_PASS
+        db_path = os.environ["DB_PATH"]
+        lock_errors = {"count": 0}
+        lock_errors_guard = threading.Lock()
+
+        def count_lock_error(sender, exception, **extra):
+            if "database is locked" in str(exception):
+                with lock_errors_guard:
+                    lock_errors["count"] += 1
+
+        got_request_exception.connect(count_lock_error, voting_app.app)
+        inbox = CodeInbox()
+        email_dispatched.connect(inbox.deliver)
+
+        def make_session():
+            return TestClientSession(voting_app.app)
+
+    upload_seconds = set_up_election(make_session(), admin_user, admin_pass, ballot_name, questions, args.roster)
+    print(f"Uploaded {args.roster} roster rows in {upload_seconds:.2f}s")
+
+    recorder = Recorder()
+    voter_indexes = random.Random(args.seed).sample(range(args.roster), args.voters)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(
+                run_voter,
+                make_session,
+                recorder,
+                inbox,
+                ballot_name,
+                questions,
+                voting_password,
+                index,
+                args.seed,
+                args.resubmit_rate,
+            )
+            for index in voter_indexes
+        ]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as exc:
+                recorder.fail(f"client error: {type(exc).__name__}")
+    elapsed = time.perf_counter() - started
+
+    request_count = sum(len(values) for values in recorder.latencies.values())
+    print(f"\n{recorder.completed_voters}/{args.voters} voters finished in {elapsed:.2f}s with {args.concurrency} concurrent voters")
+    print(f"Throughput: {recorder.completed_voters / elapsed:.1f} voters/s, {request_count / elapsed:.1f} requests/s")
+    print(f"\n{'step':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for step in STEPS:
+        values = sorted(recorder.latencies[step])
+        print(
+            f"{step:<12}{len(values):>8}"
+            f"{percentile(values, 0.50) * 1000:>10.1f}"
+            f"{percentile(values, 0.95) * 1000:>10.1f}"
+            f"{percentile(values, 0.99) * 1000:>10.1f}"
+        )
+    if lock_errors is not None:
+        print(f"\nSQLite lock errors: {lock_errors['count']}")
+    if recorder.failures:
+        print("Failures:")
+        for reason, count in sorted(recorder.failures.items()):
+            print(f"  {reason}: {count}")
+    else:
+        print("Failures: none")
+
+    if db_path:
+        problems = verify_tallies(db_path, ballot_name, recorder)
+        if problems:
+            print("Tally check: FAILED")
+            for problem in problems:
+                print(f"  {problem}")
+            raise SystemExit(1)
+        print("Tally check: stored votes match submitted ballots")
+    else:
+        print("Tally check: skipped (pass --db-path to verify)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Multi-node consistency check: several app instances sharing one database.
+
+Starts --nodes copies of the app with MULTI_NODE=1 against one SQLite file
+(or --database-url, e.g. a Postgres database), each on its own port with an
+empty CANDIDATES_PATH so nothing can come from a local file. Then:
+
+1. creates a ballot through node 0, edits it through the last node, and waits
+   until every node serves each change;
+2. lets every node cache "no roster yet", uploads the roster through node 1,
+   and checks that every node then turns away a voter who is not on it;
+3. runs voters whose requests hop between nodes at random (so sessions, the
+   one-time ballot tokens and duplicate submissions all cross nodes);
+4. checks every node renders the same results and, for SQLite, that the
+   stored tallies match what the voters submitted.
+
+    python benchmarks/multinode_check.py --nodes 3 --voters 200
+"""
+import argparse
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from loadtest import (  # noqa: E402
+    REPO_ROOT,
+    HttpSession,
+    Recorder,
+    ballot_form,
+    build_questions,
+    build_roster_xlsx,
+    free_port,
+    letters_for,
+    run_voter,
+    verify_tallies,
+    wait_until_ready,
+)
+
+RESULTS_SECTION_PATTERN = re.compile(r"<h1>Voting Results</h1>.*", re.S)
+
+
+class HoppingSession:
+    """One browser whose requests land on a random node each time."""
+
+    def __init__(self, base_urls, rng):
+        self.cookies = {}
+        self.rng = rng
+        self.sessions = []
+        for base_url in base_urls:
+            session = HttpSession(base_url)
+            session.cookies = self.cookies
+            self.sessions.append(session)
+
+    def request(self, method, path, data=None, files=None, node=None):
+        index = self.rng.randrange(len(self.sessions)) if node is None else node
+        return self.sessions[index].request(method, path, data=data, files=files)
+
+
+def start_nodes(count, work_dir, database_url, poll_seconds):
+    nodes = []
+    for index in range(count):
+        node_dir = work_dir / f"node{index}"
+        node_dir.mkdir()
+        port = free_port()
+        env = dict(os.environ)
+        env.update(
+            {
+                "MULTI_NODE": "1",
+                "CANDIDATES_PATH": str(node_dir / "candidates.json"),
+                "ARCHIVE_DIR": str(work_dir / "archive"),
+                "BACKUP_DIR": str(node_dir / "backups"),
+                "EMAIL_VERIFICATION": "0",
+                "MAIL_SUPPRESS_SEND": "1",
+                "CACHE_VERSION_POLL_SECONDS": str(poll_seconds),
+            }
+        )
+        if database_url:
+            env["DATABASE_URL"] = database_url
+        else:
+            env.pop("DATABASE_URL", None)
+            env["DB_PATH"] = str(work_dir / "votes.db")
+        log_file = (node_dir / "server.log").open("w")
+        process = subprocess.Popen(
+            [sys.executable, "-m", "flask", "--app", "app", "run", "--host", "127.0.0.1", "--port", str(port)],
+            cwd=REPO_ROOT,
+            env=env,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+        )
+        nodes.append({"process": process, "url": f"http://127.0.0.1:{port}", "log": node_dir / "server.log"})
+        # Start one at a time so only the first node seeds the shared tables.
+        wait_until_ready(nodes[-1])
+    return nodes
+
+
+def wait_for_every_node(session, node_count, path, predicate, timeout_seconds):
+    """Poll each node until predicate(body) holds; return the slowest node's delay."""
+    started = time.monotonic()
+    slowest = 0.0
+    for node in range(node_count):
+        while True:
+            status, _, body = session.request("GET", path, node=node)
+            if status == 200 and predicate(body):
+                slowest = max(slowest, time.monotonic() - started)
+                break
+            if time.monotonic() - started > timeout_seconds:
+                raise SystemExit(f"node {node} did not pick up the change to {path} within {timeout_seconds}s")
+            time.sleep(0.05)
+    return slowest
+
+
+def verify_outsider(node_urls, node, voting_password, ballot_name, suffix):
+    session = HoppingSession(node_urls, random.Random())
+    session.request("POST", "/login", {"password": voting_password}, node=node)
+    _, location, _ = session.request(
+        "POST",
+        "/verify_email",
+        {"year": ballot_name, "full_name": f"Outside Voter {suffix}", "email": f"ov{suffix}"},
+        node=node,
+    )
+    return location.endswith("/vote")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--roster", type=int, default=2000)
+    parser.add_argument("--voters", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--resubmit-rate", type=float, default=0.2)
+    parser.add_argument("--poll-seconds", type=float, default=1.0, help="CACHE_VERSION_POLL_SECONDS for every node")
+    parser.add_argument("--database-url", help="shared database for all nodes instead of a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=2026)
+    args = parser.parse_args()
+    if args.nodes < 2:
+        parser.error("--nodes must be at least 2")
+
+    from dotenv import load_dotenv
+
+    load_dotenv(REPO_ROOT / "csu-voting.env")
+    voting_password = os.getenv("VOTING_PASSWORD")
+    admin_user = os.getenv("ADMIN_USER", "admin")
+    admin_pass = os.getenv("ADMIN_PASS", "password")
+    work_dir = Path(tempfile.mkdtemp(prefix="csu-voting-multinode-"))
+    propagation_limit = args.poll_seconds * 3 + 2
+
+    nodes = start_nodes(args.nodes, work_dir, args.database_url, args.poll_seconds)
+    node_urls = [node["url"] for node in nodes]
+    print(f"Started {args.nodes} nodes against {args.database_url or work_dir / 'votes.db'}")
+    problems = []
+    try:
+        admin = HoppingSession(node_urls, random.Random(args.seed))
+        status, _, _ = admin.request("POST", "/admin/login", {"username": admin_user, "password": admin_pass}, node=0)
+        if status != 302:
+            raise SystemExit("Admin login failed; check ADMIN_USER / ADMIN_PASS.")
+
+        ballot_name = f"Multi Node {int(time.time()) % 100000}"
+        questions = build_questions()
+        admin.request("POST", "/admin/election/add", {"election_name": ballot_name}, node=0)
+        admin.request("POST", "/admin/ballot/update", ballot_form(ballot_name, questions, "First draft."), node=0)
+        delay = wait_for_every_node(admin, args.nodes, "/admin", lambda body: "First draft." in body, propagation_limit)
+        print(f"Ballot created on node 0 visible on every node after {delay:.2f}s")
+        admin.request("POST", "/admin/ballot/update", ballot_form(ballot_name, questions, "Final wording."), node=args.nodes - 1)
+        delay = wait_for_every_node(admin, args.nodes, "/admin", lambda body: "Final wording." in body, propagation_limit)
+        print(f"Ballot edited on node {args.nodes - 1} visible on every node after {delay:.2f}s")
+
+        # With no roster loaded anyone may vote, and each node caches that.
+        for node in range(args.nodes):
+            if not verify_outsider(node_urls, node, voting_password, ballot_name, f"before{letters_for(node)}"):
+                problems.append(f"node {node} rejected a voter before any roster was loaded")
+        admin.request(
+            "POST",
+            "/admin/eligible_voters/upload",
+            {"year": ballot_name},
+            files={"eligible_voters_excel": ("roster.xlsx", build_roster_xlsx(args.roster))},
+            node=1 % args.nodes,
+        )
+        time.sleep(propagation_limit)
+        for node in range(args.nodes):
+            if verify_outsider(node_urls, node, voting_password, ballot_name, f"after{letters_for(node)}"):
+                problems.append(f"node {node} still accepts voters missing from the uploaded roster")
+        print("Roster uploaded on node 1 enforced on every node" if not problems else "Roster check failed")
+
+        recorder = Recorder()
+        voter_indexes = random.Random(args.seed).sample(range(args.roster), args.voters)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [
+                pool.submit(
+                    run_voter,
+                    lambda: HoppingSession(node_urls, random.Random()),
+                    recorder,
+                    None,
+                    ballot_name,
+                    questions,
+                    voting_password,
+                    index,
+                    args.seed,
+                    args.resubmit_rate,
+                )
+                for index in voter_indexes
+            ]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as exc:
+                    recorder.fail(f"client error: {type(exc).__name__}")
+        elapsed = time.perf_counter() - started
+        resubmits = len(recorder.latencies["resubmit"])
+        print(f"{recorder.completed_voters}/{args.voters} voters hopping across nodes finished in {elapsed:.2f}s ({resubmits} resubmitted)")
+        for reason, count in sorted(recorder.failures.items()):
+            problems.append(f"{count} x {reason}")
+
+        results_pages = set()
+        for node in range(args.nodes):
+            _, _, body = admin.request("GET", "/results", node=node)
+            match = RESULTS_SECTION_PATTERN.search(body)
+            results_pages.add(match.group(0) if match else body)
+        if len(results_pages) != 1:
+            problems.append("nodes render different results pages")
+        else:
+            print("Every node renders the same results page")
+
+        database_url = args.database_url or ""
+        if not database_url or urlsplit(database_url).scheme.startswith("sqlite"):
+            db_path = database_url.split(":///", 1)[1] if database_url else work_dir / "votes.db"
+            problems.extend(verify_tallies(db_path, ballot_name, recorder))
+    finally:
+        for node in nodes:
+            node["process"].terminate()
+        for node in nodes:
+            node["process"].wait(timeout=10)
+
+    if problems:
+        print("\nProblems:")
+        for problem in problems:
+            print(f"  {problem}")
+        raise SystemExit(1)
+    print("\nConsistent: edits, roster and votes agree across every node")
+
+
+if __name__ == "__main__":
+    main()
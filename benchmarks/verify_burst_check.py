@@ -0,0 +1,146 @@
+"""Concurrent POST /verify_email for the same voter must not fail.
+
+A double click or an impatient voter sends several verify requests at once.
+Each burst must get the same answer as a resend within the minute: every
+request is sent on to /verify_code, exactly one code is emailed, and only one
+verification_code row exists. A burst of simultaneous wrong guesses at one
+code must still be cut off at the attempt limit. Runs in-process against a
+throwaway database:
+
+    python benchmarks/verify_burst_check.py --burst 6 --trials 20 --guesses 40
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from loadtest import REPO_ROOT, TestClientSession, build_questions, roster_entry, set_up_election  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=6, help="simultaneous verify requests per voter")
+    parser.add_argument("--trials", type=int, default=20, help="voters to try, one burst each")
+    parser.add_argument("--guesses", type=int, default=40, help="simultaneous wrong guesses at one voter's code")
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="csu-voting-verify-burst-"))
+    os.environ["DB_PATH"] = str(work_dir / "votes.db")
+    os.environ["CANDIDATES_PATH"] = str(work_dir / "candidates.json")
+    os.environ["ARCHIVE_DIR"] = str(work_dir / "archive")
+    os.environ["BACKUP_DIR"] = str(work_dir / "backups")
+    os.environ.pop("DATABASE_URL", None)
+    os.environ["EMAIL_VERIFICATION"] = "1"
+    os.environ["MAIL_SUPPRESS_SEND"] = "1"
+    sys.path.insert(0, str(REPO_ROOT))
+    os.chdir(REPO_ROOT)
+    import app as voting_app
+    from flask import got_request_exception
+    from flask_mail import email_dispatched
+
+    ballot_name = "Verify Burst"
+    set_up_election(
+        TestClientSession(voting_app.app),
+        voting_app.ADMIN_USER,
+        voting_app.ADMIN_PASS,
+        ballot_name,
+        build_questions(),
+        args.trials,
+    )
+
+    guard = threading.Lock()
+    sent = {}
+    errors = []
+
+    def count_message(message, **extra):
+        with guard:
+            for recipient in message.recipients:
+                sent[recipient] = sent.get(recipient, 0) + 1
+
+    def record_error(sender, exception, **extra):
+        with guard:
+            errors.append(f"{type(exception).__name__}: {exception}".splitlines()[0])
+
+    email_dispatched.connect(count_message)
+    got_request_exception.connect(record_error, voting_app.app)
+
+    problems = []
+    for trial in range(args.trials):
+        entry = roster_entry(trial)
+        email = f"{entry['email_local']}@student.csuniv.edu"
+        sessions = [TestClientSession(voting_app.app) for _ in range(args.burst)]
+        for session in sessions:
+            session.request("POST", "/login", {"password": voting_app.VOTING_PASSWORD})
+        barrier = threading.Barrier(args.burst)
+
+        def submit(session):
+            barrier.wait()
+            return session.request(
+                "POST",
+                "/verify_email",
+                {"year": ballot_name, "full_name": entry["full_name"], "email": entry["email_local"]},
+            )
+
+        with ThreadPoolExecutor(max_workers=args.burst) as pool:
+            responses = list(pool.map(submit, sessions))
+        voting_app.mailer.flush()
+        for status, location, _ in responses:
+            if status != 302 or not location.endswith("/verify_code"):
+                problems.append(f"{email}: HTTP {status} to {location or 'no redirect'}")
+        if sent.get(email, 0) != 1:
+            problems.append(f"{email}: {sent.get(email, 0)} codes emailed")
+
+    # Guesses go straight to check_verification_code; "x" never matches a code.
+    guessed_email = f"{roster_entry(0)['email_local']}@student.csuniv.edu"
+    guess_barrier = threading.Barrier(args.guesses)
+
+    def guess(_):
+        with voting_app.app.app_context():
+            guess_barrier.wait()
+            return voting_app.check_verification_code(guessed_email, ballot_name, "x")
+
+    with ThreadPoolExecutor(max_workers=args.guesses) as pool:
+        outcomes = list(pool.map(guess, range(args.guesses)))
+    checked = sum(1 for _, message in outcomes if message == "That verification code is not correct.")
+    if any(ok for ok, _ in outcomes):
+        problems.append("a wrong guess was accepted")
+    if checked > voting_app.VERIFICATION_CODE_MAX_ATTEMPTS:
+        problems.append(
+            f"{checked} of {args.guesses} simultaneous guesses were checked; "
+            f"the limit is {voting_app.VERIFICATION_CODE_MAX_ATTEMPTS}"
+        )
+
+    connection = sqlite3.connect(os.environ["DB_PATH"])
+    try:
+        duplicated = connection.execute(
+            "SELECT COUNT(*) FROM (SELECT email FROM verification_code WHERE year = ? GROUP BY email HAVING COUNT(*) > 1)",
+            (ballot_name,),
+        ).fetchone()[0]
+        stored_attempts = connection.execute(
+            "SELECT attempts FROM verification_code WHERE year = ? AND email = ?",
+            (ballot_name, guessed_email),
+        ).fetchone()[0]
+    finally:
+        connection.close()
+    if stored_attempts != voting_app.VERIFICATION_CODE_MAX_ATTEMPTS:
+        problems.append(f"{stored_attempts} attempts stored after {args.guesses} wrong guesses")
+    if duplicated:
+        problems.append(f"{duplicated} voters have more than one verification code row")
+    problems.extend(errors)
+
+    if problems:
+        print(f"{len(problems)} problems in {args.trials} bursts of {args.burst}:")
+        for problem in problems[:20]:
+            print(f"  {problem}")
+        raise SystemExit(1)
+    print(f"{args.trials} bursts of {args.burst} simultaneous verify requests: one code each, no errors")
+    print(f"{args.guesses} simultaneous wrong guesses: {checked} checked, the rest refused at the attempt limit")
+
+
+if __name__ == "__main__":
+    main()
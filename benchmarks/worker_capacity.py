@@ -0,0 +1,226 @@
+"""Concurrent-voter capacity of sync versus gthread gunicorn workers.
+
+Starts gunicorn once per worker class (same process count, same throwaway
+SQLite setup), keeps --slow-clients connections busy trickling a request body
+the way a voter on a poor phone connection would, and drives increasing
+numbers of simultaneous voters through login -> verify_email -> vote:
+
+    python benchmarks/worker_capacity.py --workers 2 --threads 16 --levels 8,32,96 --slow-clients 4
+
+With sync workers every slow client pins a whole process, so once there are
+as many slow clients as workers the real voters queue behind them. gthread
+workers park slow and idle connections on a thread or in the poller and keep
+serving. The run fails if any voter fails, if none finish, or if a server's
+stored tallies differ from the submitted ballots.
+"""
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from loadtest import (  # noqa: E402
+    REPO_ROOT,
+    HttpSession,
+    Recorder,
+    build_questions,
+    free_port,
+    percentile,
+    run_voter,
+    set_up_election,
+    verify_tallies,
+    wait_until_ready,
+)
+
+SLOW_BODY = b"password=slow-client-padding"
+
+
+def start_server(worker_class, workers, threads, work_dir):
+    server_dir = work_dir / worker_class
+    server_dir.mkdir()
+    port = free_port()
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)
+    env.pop("DB_POOL_SIZE", None)
+    env.update(
+        {
+            "GUNICORN_WORKER_CLASS": worker_class,
+            "WEB_CONCURRENCY": str(workers),
+            "GUNICORN_THREADS": str(threads),
+            "DB_PATH": str(server_dir / "votes.db"),
+            "CANDIDATES_PATH": str(server_dir / "candidates.json"),
+            "ARCHIVE_DIR": str(server_dir / "archive"),
+            "BACKUP_DIR": str(server_dir / "backups"),
+            "EMAIL_VERIFICATION": "0",
+            "MAIL_SUPPRESS_SEND": "1",
+        }
+    )
+    log_path = server_dir / "server.log"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}", "app:app"],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=log_path.open("w"),
+        stderr=subprocess.STDOUT,
+    )
+    server = {"process": process, "url": f"http://127.0.0.1:{port}", "port": port, "log": log_path, "db": server_dir / "votes.db"}
+    wait_until_ready(server)
+    return server
+
+
+def slow_client(port, byte_interval_seconds, stop):
+    """Send a login POST one body byte at a time, over and over, until stopped."""
+    while not stop.is_set():
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=60) as connection:
+                connection.sendall(
+                    b"POST /login HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+                    b"Content-Type: application/x-www-form-urlencoded\r\n"
+                    + f"Content-Length: {len(SLOW_BODY)}\r\nConnection: close\r\n\r\n".encode()
+                )
+                for index in range(len(SLOW_BODY)):
+                    if stop.wait(byte_interval_seconds):
+                        break
+                    connection.sendall(SLOW_BODY[index:index + 1])
+                else:
+                    connection.recv(65536)
+        except OSError:
+            stop.wait(0.1)
+
+
+def run_level(server, concurrency, voter_indexes, ballot_name, questions, voting_password, seed):
+    recorder = Recorder()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(
+                run_voter,
+                lambda: HttpSession(server["url"]),
+                recorder,
+                None,
+                ballot_name,
+                questions,
+                voting_password,
+                index,
+                seed,
+                0.0,
+            )
+            for index in voter_indexes
+        ]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as exc:
+                recorder.fail(f"client error: {type(exc).__name__}")
+    return recorder, time.perf_counter() - started
+
+
+def merge_expected(totals, recorder):
+    totals.completed_voters += recorder.completed_voters
+    for key, count in recorder.expected_plurality.items():
+        totals.expected_plurality[key] = totals.expected_plurality.get(key, 0) + count
+    for key, count in recorder.expected_ranked.items():
+        totals.expected_ranked[key] = totals.expected_ranked.get(key, 0) + count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes for both runs")
+    parser.add_argument("--threads", type=int, default=16, help="threads per gthread worker")
+    parser.add_argument("--levels", default="8,32,96", help="comma-separated numbers of simultaneous voters")
+    parser.add_argument("--voters-per-level", type=int, default=0, help="voters per level (default: 3x the level)")
+    parser.add_argument("--slow-clients", type=int, default=4, help="connections trickling a request body throughout")
+    parser.add_argument("--slow-byte-seconds", type=float, default=0.25, help="delay between each slow-client byte")
+    parser.add_argument("--worker-classes", default="sync,gthread")
+    parser.add_argument("--seed", type=int, default=2026)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    level_voters = [args.voters_per_level or level * 3 for level in levels]
+
+    from dotenv import load_dotenv
+
+    load_dotenv(REPO_ROOT / "csu-voting.env")
+    voting_password = os.getenv("VOTING_PASSWORD")
+    admin_user = os.getenv("ADMIN_USER", "admin")
+    admin_pass = os.getenv("ADMIN_PASS", "password")
+    work_dir = Path(tempfile.mkdtemp(prefix="csu-voting-capacity-"))
+    questions = build_questions()
+    roster_rows = sum(level_voters)
+
+    summary = []
+    problems = []
+    for worker_class in [name.strip() for name in args.worker_classes.split(",") if name.strip()]:
+        server = start_server(worker_class, args.workers, args.threads, work_dir)
+        stop = threading.Event()
+        slow_threads = []
+        try:
+            ballot_name = f"Capacity {worker_class}"
+            set_up_election(HttpSession(server["url"]), admin_user, admin_pass, ballot_name, questions, roster_rows)
+            for _ in range(args.slow_clients):
+                thread = threading.Thread(target=slow_client, args=(server["port"], args.slow_byte_seconds, stop), daemon=True)
+                thread.start()
+                slow_threads.append(thread)
+            time.sleep(args.slow_byte_seconds * 2)
+
+            label = worker_class if worker_class != "gthread" else f"gthread x{args.threads}"
+            print(f"\n{label}, {args.workers} workers, {args.slow_clients} slow clients")
+            print(f"{'voters':>8}{'done':>8}{'voters/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}  failures")
+            totals = Recorder()
+            rng = random.Random(args.seed)
+            remaining = list(range(roster_rows))
+            rng.shuffle(remaining)
+            for level, voter_count in zip(levels, level_voters):
+                voter_indexes, remaining = remaining[:voter_count], remaining[voter_count:]
+                recorder, elapsed = run_level(server, level, voter_indexes, ballot_name, questions, voting_password, args.seed)
+                merge_expected(totals, recorder)
+                latencies = sorted(value for step_values in recorder.latencies.values() for value in step_values)
+                failure_count = sum(recorder.failures.values())
+                print(
+                    f"{level:>8}{recorder.completed_voters:>8}"
+                    f"{recorder.completed_voters / elapsed:>10.1f}"
+                    f"{percentile(latencies, 0.50) * 1000:>10.1f}"
+                    f"{percentile(latencies, 0.95) * 1000:>10.1f}"
+                    f"{(latencies[-1] if latencies else 0) * 1000:>10.1f}"
+                    f"  {failure_count or 'none'}"
+                )
+                summary.append((label, level, recorder.completed_voters / elapsed, percentile(latencies, 0.95)))
+                for reason, count in sorted(recorder.failures.items()):
+                    print(f"{'':>8}{count} x {reason}")
+                    problems.append(f"{label}: {count} x {reason} at {level} voters")
+        finally:
+            stop.set()
+            for thread in slow_threads:
+                thread.join(timeout=5)
+            server["process"].terminate()
+            server["process"].wait(timeout=30)
+
+        lock_errors = server["log"].read_text(errors="replace").count("database is locked")
+        print(f"SQLite lock errors in server log: {lock_errors}")
+        if not totals.completed_voters:
+            problems.append(f"{label}: no voter finished; see {server['log']}")
+        for problem in verify_tallies(server["db"], ballot_name, totals):
+            problems.append(f"{label}: {problem}")
+
+    if len({label for label, _, _, _ in summary}) > 1:
+        print(f"\n{'voters':>8}" + "".join(f"{label + ' v/s':>20}{'p95 ms':>10}" for label in dict.fromkeys(row[0] for row in summary)))
+        for level in levels:
+            rows = [row for row in summary if row[1] == level]
+            print(f"{level:>8}" + "".join(f"{throughput:>20.1f}{p95 * 1000:>10.1f}" for _, _, throughput, p95 in rows))
+
+    if problems:
+        print("\nProblems:")
+        for problem in problems:
+            print(f"  {problem}")
+        raise SystemExit(1)
+    print("\nEvery voter finished and stored votes match submitted ballots on every server")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Gunicorn settings, picked up automatically by `gunicorn app:app` run from here.
+
+The default worker class is gthread: each worker process serves up to
+GUNICORN_THREADS requests at once, and idle keep-alive connections wait in
+the worker's poller without occupying a thread. A voter on a slow phone
+connection or a request waiting on the SQLite write lock then holds one
+thread instead of a whole worker process. Set GUNICORN_WORKER_CLASS=sync to
+go back to one request per process.
+
+benchmarks/worker_capacity.py compares the two under slow clients.
+"""
+import os
+
+workers = int(os.getenv("WEB_CONCURRENCY", "").strip() or 2)
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "").strip() or "gthread"
+# gunicorn silently turns sync workers into gthread ones when threads > 1.
+threads = int(os.getenv("GUNICORN_THREADS", "").strip() or 16) if worker_class == "gthread" else 1
+# Open client connections per worker, busy or idle (gthread only).
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "").strip() or 1000)
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "").strip() or 5)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "").strip() or 30)
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "").strip() or 30)
+# Import the app once in the master so table creation, column upgrades and
+# cache-version rows run a single time before any worker is forked, instead
+# of every worker racing through them against a fresh database.
+preload_app = True
+
+if worker_class == "gthread":
+    # One database connection per thread; app.py sizes its pool from this.
+    os.environ.setdefault("DB_POOL_SIZE", str(threads))
+
+
+def post_fork(server, worker):
+    # Connections the master opened during startup must not be shared with
+    # the forked workers; each worker opens its own.
+    from app import app, db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
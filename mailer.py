@@ -0,0 +1,149 @@
+"""Background email delivery on top of Flask-Mail.
+
+Request handlers hand messages to BackgroundMailer.send(), which only queues
+them. One sender thread per process drains the queue in batches over a single
+SMTP connection that stays open between batches and is closed after it has
+been idle for a while. Failed deliveries are retried with exponential backoff
+on a fresh connection.
+
+To try it locally without a real mailbox, run a debugging SMTP server that
+prints every message it receives:
+
+    python -m aiosmtpd -n -l 127.0.0.1:1025           # pip install aiosmtpd
+    python -m smtpd -n -c DebuggingServer 127.0.0.1:1025   # Python 3.11 and older
+
+then set SMTP_SERVER=127.0.0.1 and SMTP_PORT=1025 in csu-voting.env and start
+the app with MAIL_USE_TLS=0.
+"""
+import atexit
+import logging
+import queue
+import random
+import smtplib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundMailer:
+    def __init__(
+        self,
+        app,
+        mail,
+        batch_size=50,
+        batch_wait_seconds=0.5,
+        idle_timeout_seconds=30.0,
+        max_retries=5,
+        backoff_seconds=1.0,
+        max_backoff_seconds=60.0,
+        max_queue_size=10000,
+    ):
+        self.app = app
+        self.mail = mail
+        self.batch_size = batch_size
+        self.batch_wait_seconds = batch_wait_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.sent_count = 0
+        self.failed_count = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._connection = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def send(self, message):
+        """Queue a message. Returns False when the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            logger.error("Mail queue is full; dropping message to %s", message.recipients)
+            return False
+        return True
+
+    def flush(self, timeout_seconds=10.0):
+        """Wait until every queued message has been handled or the timeout passes."""
+        deadline = time.monotonic() + timeout_seconds
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return not self._queue.unfinished_tasks
+
+    def _ensure_started(self):
+        # Started on first use rather than at import so each gunicorn worker
+        # gets its own thread after the fork.
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="background-mailer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                first_message = self._queue.get(timeout=self.idle_timeout_seconds)
+            except queue.Empty:
+                self._close_connection()
+                continue
+            batch = [first_message]
+            deadline = time.monotonic() + self.batch_wait_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._deliver(batch)
+            except Exception:
+                logger.exception("Unexpected error while sending %d message(s)", len(batch))
+                self.failed_count += len(batch)
+                self._close_connection()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _deliver(self, batch):
+        pending = list(batch)
+        attempt = 0
+        with self.app.app_context():
+            while pending:
+                try:
+                    if self._connection is None:
+                        self._connection = self.mail.connect().__enter__()
+                    while pending:
+                        try:
+                            self._connection.send(pending[0])
+                        except smtplib.SMTPRecipientsRefused:
+                            # Retrying cannot help a rejected address.
+                            logger.warning("Recipient refused: %s", pending[0].recipients)
+                            self.failed_count += 1
+                        else:
+                            self.sent_count += 1
+                        pending.pop(0)
+                except (smtplib.SMTPException, OSError) as exc:
+                    self._close_connection()
+                    attempt += 1
+                    if attempt > self.max_retries:
+                        logger.error("Giving up on %d message(s) after %d attempts: %s", len(pending), attempt, exc)
+                        self.failed_count += len(pending)
+                        return
+                    delay = min(self.backoff_seconds * 2 ** (attempt - 1), self.max_backoff_seconds)
+                    delay *= random.uniform(0.8, 1.2)
+                    logger.warning("SMTP error (%s); retrying %d message(s) in %.1fs", exc, len(pending), delay)
+                    time.sleep(delay)
+
+    def _close_connection(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.__exit__(None, None, None)
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._connection = None
@@ -0,0 +1,114 @@
+"""In-process request metrics rendered in the Prometheus text format.
+
+Each worker process keeps its own registry; scrape every worker (or run a
+single worker) when you need complete numbers. Nothing here is touched unless
+METRICS_ENABLED is set, so the disabled path costs nothing per request.
+"""
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# Seconds. Covers everything from a cached page to a request stuck on a lock.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.total += value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+
+    def describe(self, name, metric_type, help_text):
+        self._help[name] = (metric_type, help_text)
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self, extra_samples=()):
+        """Return the exposition text. extra_samples is an iterable of
+        (name, labels_dict, value) read at scrape time, e.g. cache counters."""
+        samples_by_name = {}
+        with self._lock:
+            for (name, labels), histogram in self._histograms.items():
+                lines = samples_by_name.setdefault(name, [])
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(_sample(f"{name}_bucket", labels + (("le", _format_value(bound)),), cumulative))
+                lines.append(_sample(f"{name}_bucket", labels + (("le", "+Inf"),), histogram.count))
+                lines.append(_sample(f"{name}_sum", labels, histogram.total))
+                lines.append(_sample(f"{name}_count", labels, histogram.count))
+            for (name, labels), value in self._counters.items():
+                samples_by_name.setdefault(name, []).append(_sample(name, labels, value))
+        for name, labels, value in extra_samples:
+            samples_by_name.setdefault(name, []).append(_sample(name, tuple(sorted(labels.items())), value))
+
+        output = []
+        for name in sorted(samples_by_name):
+            metric_type, help_text = self._help.get(name, ("untyped", ""))
+            if help_text:
+                output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {metric_type}")
+            output.extend(samples_by_name[name])
+        return "\n".join(output) + "\n"
+
+
+def timed(registry, name, enabled):
+    """Record a function's duration in the named histogram when enabled."""
+    def decorator(function):
+        if not enabled:
+            return function
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                registry.observe(name, time.perf_counter() - started, function=function.__name__)
+        return wrapper
+    return decorator
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _sample(name, labels, value):
+    if labels:
+        label_text = ",".join(f'{key}="{_escape_label(label_value)}"' for key, label_value in labels)
+        return f"{name}{{{label_text}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
@@ -1,5 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint
 
 db = SQLAlchemy()
 
@@ -15,6 +15,7 @@ class VoterRecord(db.Model):
     identifier = db.Column(db.String(120), nullable=False)
     year = db.Column(db.String(20), nullable=False)
     has_voted = db.Column(db.Boolean, default=False)
+    voted_at = db.Column(db.DateTime, nullable=True)
     __table_args__ = (
         UniqueConstraint("method", "identifier", "year", name="uq_voter_record_scope"),
     )
@@ -22,6 +23,89 @@ class VoterRecord(db.Model):
 class Vote(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     candidate = db.Column(db.String(120), nullable=False)
+    year = db.Column(db.String(80), nullable=True)
+    question_index = db.Column(db.Integer, nullable=True)
+    __table_args__ = (
+        Index("ix_vote_ballot_question", "year", "question_index", "candidate"),
+    )
+
+class RankedBallot(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.String(80), nullable=False)
+    question_index = db.Column(db.Integer, nullable=False)
+    # JSON list of option names, most preferred first. Approval ballots store
+    # the approved options in ballot order.
+    preferences = db.Column(db.Text, nullable=False)
+    cast_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (
+        Index("ix_ranked_ballot_question", "year", "question_index"),
+    )
+
+class WriteIn(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.String(80), nullable=False)
+    question_index = db.Column(db.Integer, nullable=False)
+    raw_text = db.Column(db.String(120), nullable=False)
+    # Case, accent, punctuation and whitespace folded form used for grouping.
+    canonical_key = db.Column(db.String(120), nullable=False)
+    cast_at = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (
+        Index("ix_write_in_aggregation", "year", "question_index", "canonical_key"),
+    )
+
+class VerificationCode(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), nullable=False)
+    year = db.Column(db.String(80), nullable=False)
+    code_hash = db.Column(db.String(64), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    __table_args__ = (
+        UniqueConstraint("email", "year", name="uq_verification_code_scope"),
+    )
+
+class BallotSubmission(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # One-time token rendered into the ballot form; a repeat submission of the
+    # same token is answered from this row.
+    token = db.Column(db.String(64), unique=True, nullable=False)
+    year = db.Column(db.String(80), nullable=False)
+    voter_record_id = db.Column(db.Integer, nullable=False)
+    outcome = db.Column(db.String(20), nullable=False)
+    submitted_at = db.Column(db.DateTime, nullable=False)
+
+class BallotConfig(db.Model):
+    # Single row (id 1) holding candidates.json when MULTI_NODE is enabled.
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+class CacheVersion(db.Model):
+    # Bumped in the same transaction as the data it describes; every worker
+    # polls these to know when its in-process caches are stale.
+    name = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class ResultSnapshot(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.String(80), unique=True, nullable=False)
+    closes_at = db.Column(db.String(20), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+class ElectionArchive(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.String(80), nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+    # gzip JSON lines file under ARCHIVE_DIR holding every archived row.
+    file_name = db.Column(db.String(255), nullable=False)
+    ballot_config = db.Column(db.Text, nullable=False)
+    # Final per-question results in the shape compute_ballot_results returns.
+    results = db.Column(db.Text, nullable=False)
+    # JSON object of archived row counts per table.
+    row_counts = db.Column(db.Text, nullable=False)
+    voters = db.Column(db.Integer, nullable=False, default=0)
 
 class EligibleVoter(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -29,3 +113,16 @@ class EligibleVoter(db.Model):
     full_name = db.Column(db.String(160), nullable=False)
     email = db.Column(db.String(120), nullable=False)
     student_id = db.Column(db.String(20), nullable=True)
+    __table_args__ = (
+        Index("ix_eligible_voter_ballot_email", "year", "email"),
+    )
+
+class RosterReport(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.String(80), nullable=False, index=True)
+    uploaded_at = db.Column(db.DateTime, nullable=False)
+    file_name = db.Column(db.String(255), nullable=False)
+    # JSON object of row counts per validation status.
+    counts = db.Column(db.Text, nullable=False)
+    # One CSV line per spreadsheet row with the status it was given.
+    report_csv = db.Column(db.Text, nullable=False)
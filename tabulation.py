@@ -0,0 +1,174 @@
+"""Tabulation for ranked-choice (IRV, STV) and approval questions.
+
+Ballots come in as ``(preferences, count)`` pairs where identical rankings
+have already been grouped together; the results query does this with a
+GROUP BY on the stored preference list. Rankings are encoded once as tuples
+of option indexes and every candidate keeps a pile of the ballot groups
+currently counting for them, so an elimination or surplus transfer only
+revisits the groups sitting in that one pile instead of re-reading every
+ballot each round.
+"""
+import math
+
+VOTING_METHODS = ("plurality", "approval", "irv", "stv")
+RANKED_METHODS = ("irv", "stv")
+
+
+def encode_ballots(options, grouped_ballots):
+    option_index = {option: index for index, option in enumerate(options)}
+    encoded = {}
+    for preferences, count in grouped_ballots:
+        ranking = []
+        for option in preferences:
+            index = option_index.get(option)
+            if index is None or index in ranking:
+                continue
+            ranking.append(index)
+        if ranking and count:
+            ranking = tuple(ranking)
+            encoded[ranking] = encoded.get(ranking, 0) + count
+    return list(encoded.keys()), [float(count) for count in encoded.values()]
+
+
+def tabulate_approval(options, grouped_ballots, seats=1):
+    option_index = {option: index for index, option in enumerate(options)}
+    tallies = [0] * len(options)
+    total_ballots = 0
+    for preferences, count in grouped_ballots:
+        total_ballots += count
+        for index in {option_index[option] for option in preferences if option in option_index}:
+            tallies[index] += count
+    ordered = sorted(range(len(options)), key=lambda index: (-tallies[index], index))
+    winners = [options[index] for index in ordered[:seats] if tallies[index] > 0]
+    return {
+        "method": "approval",
+        "seats": seats,
+        "quota": None,
+        "total_ballots": total_ballots,
+        "winners": winners,
+        "rounds": [
+            {
+                "tallies": [(options[index], tallies[index]) for index in ordered],
+                "elected": winners,
+                "eliminated": [],
+                "exhausted": 0,
+            }
+        ],
+    }
+
+
+def _run_rounds(method, options, grouped_ballots, seats):
+    rankings, weights = encode_ballots(options, grouped_ballots)
+    candidate_count = len(options)
+    positions = [0] * len(rankings)
+    hopeful = [True] * candidate_count
+    piles = [[] for _ in range(candidate_count)]
+    tallies = [0.0] * candidate_count
+    for group, ranking in enumerate(rankings):
+        piles[ranking[0]].append(group)
+        tallies[ranking[0]] += weights[group]
+    first_round = list(tallies)
+    total_valid = sum(weights)
+    exhausted = 0.0
+
+    def transfer(group):
+        nonlocal exhausted
+        ranking = rankings[group]
+        position = positions[group] + 1
+        while position < len(ranking) and not hopeful[ranking[position]]:
+            position += 1
+        positions[group] = position
+        if position < len(ranking):
+            piles[ranking[position]].append(group)
+            tallies[ranking[position]] += weights[group]
+        else:
+            exhausted += weights[group]
+
+    # IRV needs a majority of the ballots still in play each round; STV uses
+    # a fixed Droop quota over every valid ballot.
+    droop_quota = math.floor(total_valid / (seats + 1)) + 1
+    elected = []
+    rounds = []
+    while len(elected) < seats:
+        continuing = [index for index in range(candidate_count) if hopeful[index]]
+        if not continuing:
+            break
+        if method == "irv":
+            quota = math.floor(sum(tallies[index] for index in continuing) / 2) + 1
+        else:
+            quota = droop_quota
+        round_record = {
+            "tallies": [
+                (options[index], round(tallies[index], 2))
+                for index in sorted(continuing, key=lambda index: (-tallies[index], index))
+            ],
+            "elected": [],
+            "eliminated": [],
+            "exhausted": round(exhausted, 2),
+            "quota": quota,
+        }
+        rounds.append(round_record)
+
+        remaining_seats = seats - len(elected)
+        if len(continuing) <= remaining_seats:
+            for index in sorted(continuing, key=lambda index: (-tallies[index], index)):
+                hopeful[index] = False
+                elected.append(index)
+                round_record["elected"].append(options[index])
+            break
+
+        winners = sorted(
+            (index for index in continuing if tallies[index] >= quota and tallies[index] > 0),
+            key=lambda index: (-tallies[index], index),
+        )[:remaining_seats]
+        if winners:
+            for index in winners:
+                hopeful[index] = False
+                elected.append(index)
+                round_record["elected"].append(options[index])
+            for index in winners:
+                surplus = tallies[index] - quota
+                factor = surplus / tallies[index] if surplus > 0 else 0.0
+                pile, piles[index] = piles[index], []
+                for group in pile:
+                    weights[group] *= factor
+                    transfer(group)
+                tallies[index] = float(quota)
+            continue
+
+        # Ties for last place go to the candidate with fewer first preferences,
+        # then to whichever option is listed later on the ballot.
+        loser = min(continuing, key=lambda index: (tallies[index], first_round[index], -index))
+        hopeful[loser] = False
+        round_record["eliminated"].append(options[loser])
+        pile, piles[loser] = piles[loser], []
+        for group in pile:
+            transfer(group)
+        tallies[loser] = 0.0
+
+    return {
+        "method": method,
+        "seats": seats,
+        "quota": droop_quota if method == "stv" else None,
+        "total_ballots": int(total_valid),
+        "winners": [options[index] for index in elected],
+        "rounds": rounds,
+    }
+
+
+def tabulate_irv(options, grouped_ballots):
+    return _run_rounds("irv", options, grouped_ballots, seats=1)
+
+
+def tabulate_stv(options, grouped_ballots, seats=1):
+    return _run_rounds("stv", options, grouped_ballots, seats=max(int(seats), 1))
+
+
+def tabulate(method, options, grouped_ballots, seats=1):
+    if method == "approval":
+        return tabulate_approval(options, grouped_ballots, seats=seats)
+    if method == "irv":
+        return tabulate_irv(options, grouped_ballots)
+    if method == "stv":
+        return tabulate_stv(options, grouped_ballots, seats=seats)
+    raise ValueError(f"Unsupported voting method: {method}")